@@ -1,10 +1,39 @@
+import base64
 import hashlib
+import hmac
+import os
 import secrets
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from typing import Optional
 
-# Simple token management (for production, use JWT)
-ADMIN_TOKENS = {}
+import models
+import stats
+from database import SessionLocal, WriterSessionLocal
+from periodic import PeriodicTask
+
+# Tokens are HMAC-signed and carry their own expiry, so any worker can verify
+# them without shared state. The key is ADMIN_TOKEN_SECRET, or else the random
+# secret migrate.py stores in app_settings, which every worker reads.
+TOKEN_SECRET_SETTING = "token_secret"
+TOKEN_CACHE_SIZE = int(os.getenv("ADMIN_TOKEN_CACHE_SIZE", "1024"))
+REVOCATION_SWEEP_INTERVAL = float(os.getenv("REVOCATION_SWEEP_INTERVAL", "300"))
+REVOCATION_CHECK = float(os.getenv("REVOCATION_CHECK", "1.0"))
+
+# Bumped by every logout; workers reload revoked_tokens when it moves
+REVOCATION_VERSION = "token_revocation_version"
+
+# token -> (admin_id, expires_at, token_id) for recently verified tokens
+VERIFIED_TOKENS = OrderedDict()
+# token_id -> expires_at for logged-out tokens that haven't expired yet, a copy
+# of revoked_tokens the sweeper thread re-reads every REVOCATION_CHECK seconds
+REVOKED_TOKENS = {}
+_lock = threading.Lock()
+_token_secret = None
+_revocation_version = None
+
 ADMIN_CREDENTIALS = {
     "admin": "hashed_password_here"  # Will be updated with actual hash
 }
@@ -24,28 +53,143 @@ def verify_password(password: str, hash_value: str) -> bool:
     except:
         return False
 
+_admin_hashes = {}
+
+def default_admin_hash(password: str) -> str:
+    """Hash of the configured admin password, computed on first use rather than at import"""
+    if password not in _admin_hashes:
+        _admin_hashes.setdefault(password, hash_password(password))
+    return _admin_hashes[password]
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def generate_token_secret(db):
+    """Store a random signing secret unless one exists (run by migrate.py)"""
+    if db.get(models.AppSetting, TOKEN_SECRET_SETTING) is None:
+        db.add(models.AppSetting(key=TOKEN_SECRET_SETTING, value=secrets.token_hex(32)))
+        db.commit()
+
+def token_secret(session_factory=SessionLocal) -> str:
+    """The signing key: ADMIN_TOKEN_SECRET, else the one generated at migrate time"""
+    global _token_secret
+    if _token_secret is None:
+        secret = os.getenv("ADMIN_TOKEN_SECRET")
+        if not secret:
+            with session_factory() as db:
+                setting = db.get(models.AppSetting, TOKEN_SECRET_SETTING)
+            if setting is None:
+                raise RuntimeError(
+                    "ADMIN_TOKEN_SECRET is not set and no secret was generated; "
+                    "run `python migrate.py`"
+                )
+            secret = setting.value
+        _token_secret = secret
+    return _token_secret
+
+def _signature(payload: str) -> str:
+    return _b64encode(hmac.new(token_secret().encode(), payload.encode(), hashlib.sha256).digest())
+
+def _decode_token(token: str):
+    """Check the signature and return (admin_id, expires_at, token_id), or None"""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _signature(payload)):
+            return None
+        admin_id, expires_at, token_id = _b64decode(payload).decode().split(":")
+        return int(admin_id), int(expires_at), token_id
+    except Exception:
+        return None
+
 def create_access_token(admin_id: int, expires_delta: Optional[timedelta] = None) -> str:
-    """Create simple access token"""
+    """Create a signed, self-expiring access token"""
     if expires_delta is None:
         expires_delta = timedelta(hours=24)
-    
-    token = secrets.token_urlsafe(32)
-    expires_at = datetime.utcnow() + expires_delta
-    ADMIN_TOKENS[token] = {"admin_id": admin_id, "expires_at": expires_at}
-    
-    return token
+
+    expires_at = int(time.time() + expires_delta.total_seconds())
+    payload = _b64encode(f"{admin_id}:{expires_at}:{secrets.token_hex(8)}".encode())
+    return f"{payload}.{_signature(payload)}"
 
 def verify_token(token: str) -> Optional[int]:
     """Verify token and return admin_id"""
-    if token in ADMIN_TOKENS:
-        token_data = ADMIN_TOKENS[token]
-        if token_data["expires_at"] > datetime.utcnow():
-            return token_data["admin_id"]
-        else:
-            del ADMIN_TOKENS[token]
-    return None
-
-def logout_token(token: str):
-    """Logout by removing token"""
-    if token in ADMIN_TOKENS:
-        del ADMIN_TOKENS[token]
+    if not token:
+        return None
+
+    with _lock:
+        claims = VERIFIED_TOKENS.get(token)
+        if claims:
+            VERIFIED_TOKENS.move_to_end(token)
+    if claims is None:
+        claims = _decode_token(token)
+        if claims is None:
+            return None
+
+    admin_id, expires_at, token_id = claims
+    if expires_at <= time.time() or token_id in REVOKED_TOKENS:
+        with _lock:
+            VERIFIED_TOKENS.pop(token, None)
+        return None
+
+    with _lock:
+        VERIFIED_TOKENS[token] = claims
+        while len(VERIFIED_TOKENS) > TOKEN_CACHE_SIZE:
+            VERIFIED_TOKENS.popitem(last=False)
+    return admin_id
+
+def refresh_revoked_tokens(session_factory=SessionLocal):
+    """Re-read revoked_tokens if any worker has logged out since the last read"""
+    global _revocation_version
+    with session_factory() as db:
+        version = stats.get_counter(db, REVOCATION_VERSION)
+        if version != _revocation_version:
+            revoked = models.RevokedToken
+            rows = db.query(revoked.token_id, revoked.expires_at).filter(
+                revoked.expires_at > time.time()
+            ).all()
+            with _lock:
+                REVOKED_TOKENS.clear()
+                REVOKED_TOKENS.update(rows)
+                _revocation_version = version
+
+def logout_token(token: str, session_factory=WriterSessionLocal):
+    """Logout by revoking the token, for every worker, until it would have expired anyway"""
+    claims = _decode_token(token)
+    if claims:
+        with session_factory() as db:
+            stats.add_counter(db, REVOCATION_VERSION, 1)
+            if db.get(models.RevokedToken, claims[2]) is None:
+                db.add(models.RevokedToken(token_id=claims[2], expires_at=claims[1]))
+            db.commit()
+        with _lock:
+            REVOKED_TOKENS[claims[2]] = claims[1]
+            VERIFIED_TOKENS.pop(token, None)
+
+def sweep_revoked_tokens(session_factory=SessionLocal):
+    """Forget revocations for tokens that have expired on their own"""
+    now = time.time()
+    with session_factory() as db:
+        expired = db.query(models.RevokedToken).filter(models.RevokedToken.expires_at <= now)
+        expired.delete(synchronize_session=False)
+        db.commit()
+    with _lock:
+        for token_id in [t for t, expires_at in REVOKED_TOKENS.items() if expires_at <= now]:
+            del REVOKED_TOKENS[token_id]
+
+revocation_refresher = PeriodicTask("token-revocation-refresher", refresh_revoked_tokens,
+                                    REVOCATION_CHECK, run_first=True)
+revocation_sweeper = PeriodicTask("token-revocation-sweeper", sweep_revoked_tokens,
+                                  REVOCATION_SWEEP_INTERVAL)
+
+def start_revocation_sweeper(interval: float = REVOCATION_SWEEP_INTERVAL,
+                             check: float = REVOCATION_CHECK):
+    """Refresh revocations every `check` seconds and sweep them every `interval`, in daemon threads
+
+    Requests only ever read REVOKED_TOKENS. If the database is unreachable the
+    last known set stays in force, so a logout elsewhere during the outage
+    takes effect here once the refresh succeeds again.
+    """
+    revocation_refresher.start(check)
+    revocation_sweeper.start(interval)
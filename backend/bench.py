@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+"""
+Per-endpoint benchmark for the job portal API
+
+Seeds a SQLite database at a chosen scale, drives every route of main.app
+in-process over ASGI at a fixed concurrency, reports p50/p95/p99 latency
+and throughput per route, and compares them against a committed baseline.
+Each route gets --warmup unrecorded requests, then is measured over
+--rounds passes and reported as the median of those, so one slow pass on
+a busy machine doesn't read as a regression.
+
+    python bench.py --scale small
+    python bench.py --scale small,medium --concurrency 16
+    python bench.py --scale small --update-baseline
+
+Exits with status 1 when a route's latency regresses past --threshold (by
+at least --min-slowdown ms), when a route has no baseline entry yet, or when
+importing main (what every worker pays on boot) exceeds --import-budget.
+Add a new route's baseline in the commit that adds the route.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "bench_baseline.json")
+DEFAULT_DB_DIR = os.path.join(HERE, ".bench")
+
+SCALES = {
+    "small": {"jobs": 1_000, "visits": 10_000},
+    "medium": {"jobs": 50_000, "visits": 1_000_000},
+    "large": {"jobs": 500_000, "visits": 50_000_000},
+}
+
+TITLES = ["Python Developer", "Java Engineer", "Data Analyst", "DevOps Engineer", "QA Tester",
+          "Frontend Developer", "Backend Engineer", "Product Manager", "Support Engineer",
+          "Machine Learning Engineer", "Business Analyst", "Cloud Architect"]
+COMPANIES = ["Infosys", "TCS", "Wipro", "Accenture", "HCL", "Tech Mahindra", "Cognizant",
+             "Capgemini", "Deloitte", "IBM", "Amazon", "Google", "Microsoft", "Zoho"]
+LOCATIONS = ["Hyderabad", "Bangalore", "Chennai", "Pune", "Mumbai", "Delhi", "Remote", "Noida"]
+YEARS = ["0-1", "0-2", "1-3", "2-5", "3-6", "5+", "8+"]
+WORDS = ["python", "java", "sql", "cloud", "aws", "react", "api", "testing", "data", "linux",
+         "agile", "docker", "kubernetes", "analytics", "support", "design", "security"]
+USER_AGENTS = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0",
+               "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Safari/604.1",
+               "Mozilla/5.0 (X11; Linux x86_64) Firefox/121.0",
+               "Googlebot/2.1 (+http://www.google.com/bot.html)"]
+
+SEED_CHUNK = 10_000
+
+# ===================== SEEDING =====================
+
+def seed_database(path: str, scale: dict, rng: random.Random):
+    """Create the schema at `path` and fill it with synthetic jobs and visits"""
+    from sqlalchemy import create_engine, insert
+    import models
+
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Admin), [{
+            "id": 1, "username": "admin", "email": "admin@manaworks.online", "password": "",
+        }])
+
+        for start in range(0, scale["jobs"], SEED_CHUNK):
+            rows = []
+            for _ in range(start, min(start + SEED_CHUNK, scale["jobs"])):
+                created_at = now - datetime.timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+                rows.append({
+                    "job_name": rng.choice(TITLES),
+                    "company": rng.choice(COMPANIES),
+                    "job_description": " ".join(rng.choices(WORDS, k=40)),
+                    "eligible_years": ", ".join(sorted(rng.sample(YEARS, rng.randint(1, 3)))),
+                    "qualification": "B.Tech / M.Tech",
+                    "link": f"https://example.com/apply/{rng.randint(1, 10**9)}",
+                    "location": rng.choice(LOCATIONS),
+                    "last_date": (now + datetime.timedelta(days=rng.randint(-30, 60))).strftime(
+                        "%Y-%m-%d"
+                    ),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "admin_id": 1,
+                    "is_active": rng.random() > 0.05,
+                })
+            conn.execute(insert(models.Job), rows)
+
+        ip_pool = max(scale["visits"] // 20, 1)
+        for start in range(0, scale["visits"], SEED_CHUNK):
+            rows = []
+            for _ in range(start, min(start + SEED_CHUNK, scale["visits"])):
+                ip = rng.randint(0, ip_pool)
+                rows.append({
+                    "ip_address": f"10.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}",
+                    "user_agent": rng.choice(USER_AGENTS),
+                    "job_id": rng.randint(1, scale["jobs"]) if rng.random() < 0.6 else None,
+                    "visited_at": now - datetime.timedelta(seconds=rng.randint(0, 90 * 24 * 3600)),
+                })
+            conn.execute(insert(models.UserVisit), rows)
+    engine.dispose()
+
+# ===================== IN-PROCESS ASGI CLIENT =====================
+
+async def asgi_request(app, method: str, path: str, query: str = "", body: bytes = b"",
+                       headers: dict = None, client_ip: str = "127.0.0.1",
+                       read_limit: int = None):
+    """Send one request straight into the ASGI app; returns (status, body)
+
+    With `read_limit`, the client disconnects once that many body bytes have
+    arrived, so endless (SSE) or large (export) responses are read bounded.
+    """
+    raw_headers = [(b"host", b"bench"), (b"content-type", b"application/json")]
+    raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": raw_headers,
+        "client": (client_ip, 50000), "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    status = 0
+    chunks = []
+    received = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, received
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not done.is_set():
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if not message.get("more_body") or (read_limit and received >= read_limit):
+                done.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+# ===================== ROUTES =====================
+
+def job_payload(rng):
+    return {
+        "job_name": rng.choice(TITLES), "company": rng.choice(COMPANIES),
+        "job_description": " ".join(rng.choices(WORDS, k=40)),
+        "eligible_years": rng.choice(YEARS), "qualification": "B.Tech",
+        "link": "https://example.com/apply", "location": rng.choice(LOCATIONS),
+        "last_date": "2030-12-31",
+    }
+
+def build_routes(ctx: dict):
+    """(name, method, request factory, options) for every route
+
+    Each factory returns (path, query, body). Options: "read_limit" bounds
+    the bytes read from a streaming response; "requests" and "concurrency"
+    cap those for routes too slow to run --requests times, or that only
+    queue behind one another for the write lock.
+    """
+    import auth
+    from pagination import encode_sync_token
+
+    rng = ctx["rng"]
+    token = ctx["token"]
+    jobs = ctx["jobs"]
+
+    def job_id():
+        return rng.randint(1, jobs)
+
+    routes = [
+        ("GET /api/health", "GET", lambda: ("/api/health", "", b"")),
+        ("GET /api/jobs", "GET", lambda: ("/api/jobs", "", b"")),
+        ("GET /api/jobs?limit", "GET", lambda: ("/api/jobs", "limit=20", b"")),
+        ("GET /api/jobs?fields=summary&limit", "GET",
+         lambda: ("/api/jobs", "fields=summary&limit=20", b"")),
+        ("GET /api/jobs/changes", "GET", lambda: ("/api/jobs/changes", "", b"")),
+        ("GET /api/jobs/changes?since", "GET", lambda: (
+            "/api/jobs/changes", f"since={encode_sync_token(0, job_id())}&limit=100", b"")),
+        ("GET /api/jobs/trending", "GET",
+         lambda: ("/api/jobs/trending", "window=24h&limit=10", b"")),
+        ("GET /api/jobs/{id}", "GET", lambda: (f"/api/jobs/{job_id()}", "", b"")),
+        ("GET /api/search?q", "GET", lambda: ("/api/search", f"q={rng.choice(WORDS)}", b"")),
+        ("GET /api/search?q&limit", "GET",
+         lambda: ("/api/search", f"q={rng.choice(WORDS)}&limit=20", b"")),
+        ("GET /api/search?q&fields=summary&limit", "GET",
+         lambda: ("/api/search", f"q={rng.choice(WORDS)}&fields=summary&limit=20", b"")),
+        ("GET /api/search?q&fuzzy", "GET",
+         lambda: ("/api/search",
+                  f"q={rng.choice(COMPANIES)[:-1]}x&fuzzy=true&fields=summary&limit=20", b"")),
+        ("GET /api/search?location&years", "GET",
+         lambda: ("/api/search",
+                  f"location={rng.choice(LOCATIONS)}&years={rng.choice(YEARS)}&limit=20", b"")),
+        ("GET /api/search?experience", "GET",
+         lambda: ("/api/search", f"experience={rng.randint(0, 10)}&fields=summary&limit=20", b"")),
+        ("GET /api/search?closing_after&closing_before", "GET",
+         lambda: ("/api/search",
+                  "closing_after=2026-01-01&closing_before=2026-03-01"
+                  "&fields=summary&limit=20", b"")),
+        ("GET /api/suggest?prefix", "GET",
+         lambda: ("/api/suggest", f"prefix={rng.choice(WORDS)[:3]}", b"")),
+        ("GET /api/years", "GET", lambda: ("/api/years", "", b"")),
+        ("GET /api/locations", "GET", lambda: ("/api/locations", "", b"")),
+        ("GET /api/stats", "GET", lambda: ("/api/stats", "", b"")),
+        ("GET /api/stats/jobs/{id}", "GET", lambda: (f"/api/stats/jobs/{job_id()}", "", b"")),
+        ("GET /api/stats/stream", "GET", lambda: ("/api/stats/stream", "", b""),
+         {"read_limit": 1}),
+        ("GET /api/metrics", "GET", lambda: ("/api/metrics", "", b"")),
+        ("GET /api/admin/verify", "GET", lambda: ("/api/admin/verify", f"token={token}", b"")),
+        ("POST /api/admin/login", "POST", lambda: (
+            "/api/admin/login", "",
+            json.dumps({"username": "admin", "password": ctx["password"]}).encode())),
+        ("POST /api/admin/logout", "POST", lambda: (
+            "/api/admin/logout", f"token={auth.create_access_token(ctx['admin_id'])}", b"")),
+        ("GET /api/admin/export/{table}", "GET", lambda: (
+            f"/api/admin/export/{rng.choice(['jobs', 'user_visits'])}",
+            f"token={token}&format={rng.choice(['ndjson', 'csv'])}", b""),
+         {"read_limit": 64 * 1024}),
+        ("POST /api/admin/stats/recompute", "POST",
+         lambda: ("/api/admin/stats/recompute", f"token={token}", b""),
+         {"requests": 10, "concurrency": 1}),
+        ("POST /api/jobs", "POST", lambda: (
+            "/api/jobs", f"token={token}", json.dumps(job_payload(rng)).encode())),
+        ("POST /api/jobs/bulk", "POST", lambda: (
+            "/api/jobs/bulk", f"token={token}",
+            json.dumps([job_payload(rng) for _ in range(50)]).encode())),
+        ("PUT /api/jobs/{id}", "PUT", lambda: (
+            f"/api/jobs/{job_id()}", f"token={token}",
+            json.dumps({"location": rng.choice(LOCATIONS)}).encode())),
+        ("DELETE /api/jobs/{id}", "DELETE",
+         lambda: (f"/api/jobs/{job_id()}", f"token={token}", b"")),
+    ]
+    return [route if len(route) == 4 else (*route, {}) for route in routes]
+
+# ===================== MEASUREMENT =====================
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+async def drive_route(app, method, factory, requests: int, concurrency: int, rng,
+                      read_limit: int = None) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        path, query, body = factory()
+        async with semaphore:
+            started = time.perf_counter()
+            client_ip = f"10.9.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            status, _ = await asgi_request(app, method, path, query, body, client_ip=client_ip,
+                                           read_limit=read_limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if status >= 500:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+    }
+
+def median_result(passes: list) -> dict:
+    """Per-metric median over the passes of one route; errors are summed"""
+    result = {}
+    for key in ("p50", "p95", "p99", "rps"):
+        values = sorted(p[key] for p in passes)
+        result[key] = values[len(values) // 2]
+    result["errors"] = sum(p["errors"] for p in passes)
+    return result
+
+async def run_benchmark(app, ctx: dict, requests: int, concurrency: int,
+                        warmup: int = 20, rounds: int = 3) -> dict:
+    await app.router.startup()
+    try:
+        status, body = await asgi_request(app, "POST", "/api/admin/login", body=json.dumps(
+            {"username": "admin", "password": ctx["password"]}).encode())
+        if status != 200:
+            raise SystemExit(f"admin login failed: {status} {body[:200]!r}")
+        ctx["token"] = json.loads(body)["access_token"]
+        ctx["admin_id"] = json.loads(body)["admin_id"]
+
+        results = {}
+        for name, method, factory, options in build_routes(ctx):
+            route_requests = min(requests, options.get("requests", requests))
+            route_concurrency = min(concurrency, options.get("concurrency", concurrency))
+            if warmup:
+                await drive_route(app, method, factory, min(warmup, route_requests),
+                                  route_concurrency, ctx["rng"], options.get("read_limit"))
+            result = results[name] = median_result([
+                await drive_route(app, method, factory, route_requests, route_concurrency,
+                                  ctx["rng"], options.get("read_limit"))
+                for _ in range(rounds)
+            ])
+            print(f"  {name:<34} p50 {result['p50']:>9.2f} ms  p95 {result['p95']:>9.2f} ms"
+                  f"  p99 {result['p99']:>9.2f} ms  {result['rps']:>8.1f} req/s", flush=True)
+        return results
+    finally:
+        await app.router.shutdown()
+
+def measure_import_ms() -> float:
+    """Wall time of `import main` in a new interpreter, as a worker boot pays it"""
+    code = ("import time; started = time.perf_counter(); import main; "
+            "print(time.perf_counter() - started)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1]) * 1000
+
+def run_scale(scale_name: str, args) -> dict:
+    """Seed (or reuse) the scale's database, then benchmark a fresh copy of it"""
+    scale = SCALES[scale_name]
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{scale_name}-")
+    run_path = os.path.join(work_dir, "job_portal.db")
+    # Must be set before anything imports database.py
+    os.environ["DATABASE_URL"] = f"sqlite:///{run_path}"
+    os.environ.setdefault("ADMIN_PASSWORD", "admin123")
+
+    os.makedirs(args.db_dir, exist_ok=True)
+    seed_path = os.path.join(args.db_dir, f"{scale_name}.seed.db")
+    if not os.path.exists(seed_path):
+        print(f"Seeding {scale_name}: {scale['jobs']:,} jobs, {scale['visits']:,} visits",
+              flush=True)
+        partial = seed_path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        seed_database(partial, scale, random.Random(args.seed))
+        os.replace(partial, seed_path)
+    shutil.copyfile(seed_path, run_path)
+
+    sys.path.insert(0, HERE)
+    import migrate
+    migrate.run(log=lambda message: None)
+
+    import_ms = measure_import_ms()
+    print(f"Imported app in {import_ms:.0f} ms (fresh interpreter)", flush=True)
+    if args.import_budget and import_ms > args.import_budget:
+        raise SystemExit(f"importing main took {import_ms:.0f} ms, "
+                         f"over the {args.import_budget:.0f} ms budget")
+    import main
+
+    ctx = {
+        "rng": random.Random(args.seed),
+        "jobs": scale["jobs"],
+        "password": os.environ["ADMIN_PASSWORD"],
+    }
+    try:
+        return asyncio.run(run_benchmark(main.app, ctx, args.requests, args.concurrency,
+                                         args.warmup, args.rounds))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# ===================== BASELINE COMPARISON =====================
+
+def compare(results: dict, baseline: dict, metric: str, threshold: float,
+            min_slowdown: float = 0.0) -> list:
+    """Describe every route slower than baseline * (1 + threshold) by at least `min_slowdown` ms
+
+    Routes without a baseline entry are reported too, so a new route can't
+    go unchecked; record it with --update-baseline.
+    """
+    regressions = []
+    for scale_name, routes in results.items():
+        for route, current in routes.items():
+            if current.get("errors"):
+                regressions.append(f"{scale_name} {route}: {current['errors']} server errors")
+            expected = baseline.get(scale_name, {}).get(route)
+            if not expected or not expected.get(metric):
+                regressions.append(
+                    f"{scale_name} {route}: no baseline (run with --update-baseline)"
+                )
+                continue
+            limit = expected[metric] * (1 + threshold)
+            if current[metric] > limit and current[metric] - expected[metric] >= min_slowdown:
+                regressions.append(
+                    f"{scale_name} {route}: {metric} {current[metric]:.2f} ms > "
+                    f"{limit:.2f} ms (baseline {expected[metric]:.2f} ms)"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="small", help="comma-separated: " + ", ".join(SCALES))
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="unrecorded requests per route before measuring")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="measured passes per route; the median is reported")
+    parser.add_argument("--metric", default="p95", choices=["p50", "p95", "p99"])
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-slowdown", type=float, default=5.0,
+                        help="ignore slowdowns smaller than this many ms")
+    parser.add_argument("--import-budget", type=float, default=2000,
+                        help="fail when importing main takes longer, in ms (0 disables)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--db-dir", default=DEFAULT_DB_DIR,
+                        help="where seeded databases are cached")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    scale_names = [name.strip() for name in args.scale.split(",") if name.strip()]
+    unknown = [name for name in scale_names if name not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+
+    if args.output:
+        # Child process: one scale, results written for the parent
+        with open(args.output, "w") as f:
+            json.dump(run_scale(scale_names[0], args), f)
+        return
+
+    # Each scale runs in its own process because main reads DATABASE_URL at import
+    results = {}
+    for scale_name in scale_names:
+        print(f"== {scale_name} ==", flush=True)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            output = f.name
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                                "--scale", scale_name, "--output", output])
+        if child.returncode != 0:
+            sys.exit(child.returncode)
+        with open(output) as f:
+            results[scale_name] = json.load(f)
+        os.remove(output)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.metric, args.threshold, args.min_slowdown)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Bulk job import
+
+Rows are validated against schemas.JobCreate one by one, then every valid
+row is written with executemany INSERT/UPDATE statements in a single
+transaction, so a partner feed of thousands of postings takes the write
+lock once.
+"""
+import csv
+import datetime
+import io
+import os
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+from sqlalchemy import insert, tuple_, update
+
+import expiry
+import facets
+import models
+import schemas
+from cache import bump_catalog_version
+from database import SessionLocal
+
+MAX_BULK_ROWS = int(os.getenv("MAX_BULK_ROWS", "10000"))
+KEY_LOOKUP_CHUNK = 300
+
+
+def natural_key(row: dict) -> tuple:
+    return (row["company"], row["job_name"], row["link"])
+
+
+def parse_csv(data: bytes) -> list:
+    """Read CSV bytes (header row required) into a list of dicts"""
+    text = data.decode("utf-8-sig")
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def validate_rows(rows: list):
+    """Split raw rows into (valid JobCreate dicts with their index, per-row errors)"""
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": ["expected an object"]})
+            continue
+        try:
+            job = schemas.JobCreate.model_validate(row)
+        except ValidationError as e:
+            errors.append({
+                "row": index,
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()],
+            })
+            continue
+        valid.append((index, job.model_dump()))
+    return valid, errors
+
+
+def _existing_jobs(db, admin_id: int, keys: list) -> dict:
+    """Active jobs of this admin matching any natural key, by key"""
+    found = {}
+    for start in range(0, len(keys), KEY_LOOKUP_CHUNK):
+        chunk = keys[start:start + KEY_LOOKUP_CHUNK]
+        jobs = db.query(
+            models.Job.id, models.Job.company, models.Job.job_name, models.Job.link,
+            models.Job.eligible_years, models.Job.location, models.Job.is_active
+        ).filter(
+            models.Job.admin_id == admin_id,
+            models.Job.is_active == True,
+            tuple_(models.Job.company, models.Job.job_name, models.Job.link).in_(chunk)
+        )
+        for job in jobs:
+            found[(job.company, job.job_name, job.link)] = job
+    return found
+
+
+def import_jobs(rows: list, admin_id: int, upsert: bool = False, session_factory=SessionLocal) -> dict:
+    """Validate and write a batch of job rows; returns counts and per-row errors"""
+    valid, errors = validate_rows(rows)
+    if not valid:
+        return {"inserted": 0, "updated": 0, "errors": errors}
+
+    now = datetime.datetime.utcnow()
+    with session_factory() as db:
+        change_seq = bump_catalog_version(db)
+        existing = {}
+        if upsert:
+            # Later duplicates in the same batch win
+            latest = {natural_key(row): row for _, row in valid}
+            existing = _existing_jobs(db, admin_id, list(latest))
+            valid = [(i, row) for i, row in valid if latest[natural_key(row)] is row]
+
+        new_rows = []
+        updates = []
+        for _, row in valid:
+            row["closes_on"] = expiry.parse_last_date(row["last_date"])
+            job = existing.get(natural_key(row))
+            if job:
+                updates.append((job, {**row, "id": job.id, "updated_at": now, "change_seq": change_seq}))
+            else:
+                new_rows.append({**row, "admin_id": admin_id, "is_active": True,
+                                 "created_at": now, "updated_at": now, "change_seq": change_seq})
+
+        changes = []
+        if new_rows:
+            ids = db.scalars(
+                insert(models.Job).returning(models.Job.id, sort_by_parameter_order=True),
+                new_rows
+            ).all()
+            for job_id, row in zip(ids, new_rows):
+                changes.append((SimpleNamespace(id=job_id, **row), frozenset()))
+        if updates:
+            db.execute(update(models.Job), [values for _, values in updates])
+            for job, values in updates:
+                changes.append((SimpleNamespace(**values, is_active=True), facets.job_facets(job)))
+
+        facets.sync_many_job_facets(db, changes)
+        db.commit()
+
+    return {"inserted": len(new_rows), "updated": len(updates), "errors": errors}
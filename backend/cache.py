@@ -0,0 +1,137 @@
+"""
+Versioned response cache for public read endpoints
+
+Serialized responses are kept in an in-process LRU keyed by path and
+normalized query string. Every job write bumps a catalog version stored in
+the database; workers re-read it at most once per CACHE_VERSION_CHECK
+seconds, so a write on one worker invalidates the others almost at once.
+The ETag is derived from the version, which lets a matching If-None-Match
+get its 304 without touching the cache entry or the database.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+import models
+import stats
+from database import SessionLocal
+
+CATALOG_VERSION = "catalog_version"
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_VERSION_CHECK = float(os.getenv("CACHE_VERSION_CHECK", "1.0"))
+
+# Query parameters that never change the response body
+IGNORED_PARAMS = {"token"}
+
+
+def bump_catalog_version(db) -> int:
+    """Record a job change; call inside the write's transaction
+
+    Returns the new version, which also serves as the change sequence of
+    the jobs written (Job.change_seq). The counter row stays locked until
+    commit, so sequences become visible in order.
+    """
+    stats.add_counter(db, CATALOG_VERSION, 1)
+    return db.execute(
+        select(models.StatCounter.value).where(models.StatCounter.key == CATALOG_VERSION)
+    ).scalar_one()
+
+
+class ResponseCache:
+    """LRU/TTL cache of JSON response bodies, invalidated by the catalog version"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL,
+                 version_check=CACHE_VERSION_CHECK, session_factory=SessionLocal):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check = version_check
+        self.session_factory = session_factory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._version = 0
+        self._checked_at = 0.0
+        self._adapters = {}
+        self._lock = threading.Lock()
+
+    def version(self) -> int:
+        """Current catalog version, refreshed from the database when stale"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.version_check:
+            with self.session_factory() as db:
+                version = stats.get_counter(db, CATALOG_VERSION)
+            with self._lock:
+                if version != self._version:
+                    self.entries.clear()
+                self._version = version
+                self._checked_at = now
+        return self._version
+
+    def invalidate(self):
+        """Drop every entry and re-read the version on the next request"""
+        with self._lock:
+            self.entries.clear()
+            self._checked_at = 0.0
+
+    def respond(self, request: Request, compute, response_type=Any) -> Response:
+        """Serve a cached body (or a 304), computing and storing it on a miss"""
+        key = self._key(request)
+        version = self.version()
+        etag = f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:12]}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in self._if_none_match(request):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == version and now - entry[1] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return Response(content=entry[2], media_type="application/json", headers=headers)
+
+        self.misses += 1
+        body = self._serialize(compute(), response_type)
+        with self._lock:
+            self.entries[key] = (version, now, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def _serialize(self, data, response_type) -> bytes:
+        adapter = self._adapters.get(response_type)
+        if adapter is None:
+            adapter = self._adapters.setdefault(response_type, TypeAdapter(response_type))
+        if response_type is not Any:
+            data = adapter.validate_python(data, from_attributes=True)
+        return adapter.dump_json(data)
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        params = sorted(
+            (name, value) for name, value in request.query_params.multi_items()
+            if name not in IGNORED_PARAMS
+        )
+        return request.url.path + "?" + urlencode(params)
+
+    @staticmethod
+    def _if_none_match(request: Request) -> set:
+        header = request.headers.get("if-none-match", "")
+        return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+
+response_cache = ResponseCache()
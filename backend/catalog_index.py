@@ -0,0 +1,102 @@
+"""
+In-memory indexes over the active job catalog
+
+CatalogIndex keeps a copy of a few columns of every active job and lets a
+subclass maintain a lookup structure from them. It follows the catalog
+version (see cache.py): when another write has bumped it, only jobs whose
+updated_at moved since the last refresh are re-read and re-indexed, so
+every worker stays current without a full reload or a query per lookup.
+"""
+import datetime
+import threading
+from collections import namedtuple
+
+from sqlalchemy import func
+
+import models
+from cache import response_cache
+from database import SessionLocal
+
+# Re-read a little before the last seen updated_at, for transactions that
+# committed after a later-stamped one. Re-indexing an unchanged job is a no-op.
+REFRESH_OVERLAP = datetime.timedelta(seconds=30)
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class CatalogIndex:
+    """Base class: subclasses set `columns` and implement _add/_remove/_clear"""
+
+    columns = (models.Job.id,)
+
+    def __init__(self, session_factory=SessionLocal, cache=response_cache):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.lock = threading.RLock()
+        self.jobs = {}  # job id -> row of `columns`
+        self.version = None
+        self.since = None
+        self.generation = 0  # bumped whenever the indexed data changes
+        self.Row = namedtuple("IndexedJob", [column.key for column in self.columns])
+
+    def _add(self, job):
+        raise NotImplementedError
+
+    def _remove(self, job):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def refresh(self):
+        """Bring the index up to the current catalog version"""
+        version = self.cache.version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            with self.session_factory() as db:
+                if self.since is None:
+                    self._load(db)
+                else:
+                    self._update(db)
+            self.version = version
+
+    def rebuild(self):
+        """Drop everything and load the active catalog again"""
+        with self.lock:
+            self.since = None
+            self.version = None
+            self.refresh()
+
+    def _load(self, db):
+        self.since = db.query(func.max(models.Job.updated_at)).scalar() or EPOCH
+        self.jobs = {}
+        self._clear()
+        rows = db.query(*self.columns).filter(models.Job.is_active == True).execution_options(yield_per=5000)
+        for row in rows:
+            job = self.Row(*row)
+            self.jobs[job.id] = job
+            self._add(job)
+        self.generation += 1
+
+    def _update(self, db):
+        rows = db.query(*self.columns, models.Job.is_active, models.Job.updated_at).filter(
+            models.Job.updated_at >= self.since - REFRESH_OVERLAP
+        )
+        changed = False
+        for row in rows:
+            self.since = max(self.since, row.updated_at)
+            current = self.Row(*tuple(row)[:len(self.columns)]) if row.is_active else None
+            old = self.jobs.get(row.id)
+            if old == current:
+                continue
+            if old is not None:
+                self._remove(old)
+                del self.jobs[row.id]
+            if current is not None:
+                self.jobs[row.id] = current
+                self._add(current)
+            changed = True
+        if changed:
+            self.generation += 1
@@ -1,15 +1,103 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, Delete, Insert, Update
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 import os
 
-DATABASE_URL = "sqlite:///./job_portal.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./job_portal.db")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+# "production": WAL + tuned pragmas, one writer connection and a read-only
+# reader pool (file-backed SQLite only). "default": a single plain engine.
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+url = make_url(DATABASE_URL)
+is_sqlite = url.get_backend_name() == "sqlite"
+use_sqlite_profile = (
+    is_sqlite and DB_PROFILE == "production" and url.database not in (None, "", ":memory:")
+)
+
+def _apply_pragmas(dbapi_connection, writer: bool):
+    cursor = dbapi_connection.cursor()
+    if writer:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+if use_sqlite_profile:
+    # All writes share one connection, so writers queue in the pool instead
+    # of fighting over the database lock
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+    )
+    read_engine = create_engine(
+        url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"}),
+        connect_args={"check_same_thread": False},
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=SQLITE_READ_POOL_SIZE,
+    )
+    event.listen(engine, "connect", lambda conn, record: _apply_pragmas(conn, writer=True))
+    event.listen(read_engine, "connect", lambda conn, record: _apply_pragmas(conn, writer=False))
+
+    # Writer transactions take the database write lock at BEGIN rather than at
+    # their first write, so a pinned session's reads happen under it too
+    # (SELECT ... FOR UPDATE is a no-op on SQLite). The driver's own implicit
+    # BEGIN is turned off so SQLAlchemy issues this one instead.
+    @event.listens_for(engine, "connect")
+    def _writer_autocommit(dbapi_connection, record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _writer_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+elif is_sqlite:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False}
+    )
+    read_engine = engine
+else:
+    engine = create_engine(DATABASE_URL)
+    read_engine = engine
+
+class RoutingSession(Session):
+    """Send reads to the reader pool until the session first writes
+
+    Code that reads and then writes based on what it read must not rely on
+    that: pin the session with pin_to_writer() (or open it from
+    WriterSessionLocal) so the reads happen in the write transaction.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if read_engine is engine:
+            return engine
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["wrote"] = True
+        # Once a session has written, keep it on the writer so it reads its own writes
+        return engine if self.info.get("wrote") else read_engine
+
+def pin_to_writer(db: Session) -> Session:
+    """Run every later statement of `db` on the writer, inside the write transaction"""
+    db.info["wrote"] = True
+    return db
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+# Sessions for read-then-write work, pinned to the writer from the start
+WriterSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, info={"wrote": True}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
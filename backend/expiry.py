@@ -0,0 +1,104 @@
+"""
+Job closing dates and the expiry sweeper
+
+`Job.last_date` stays the admin's free-form text; `Job.closes_on` holds the
+same deadline as an indexed Date so searches can filter on it and the
+sweeper can find expired postings with an index range scan. The sweeper
+soft-deletes jobs whose closing date has passed, a batch per transaction,
+keeping facets, the catalog version and the response cache in step.
+"""
+import datetime
+import os
+
+from sqlalchemy import update
+
+import facets
+import models
+from cache import bump_catalog_version, response_cache
+from database import SessionLocal
+from periodic import PeriodicTask
+
+EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", "3600"))
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))
+
+DATE_FORMATS = (
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d", "%d.%m.%Y",
+    "%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%b %d %Y", "%B %d %Y",
+)
+
+
+def parse_last_date(value: str):
+    """Closing date of a last_date string such as "2026-12-31" or "31 Dec 2026", or None"""
+    if not value:
+        return None
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    try:
+        return datetime.datetime.fromisoformat(text).date()
+    except ValueError:
+        return None
+
+
+def backfill_closing_dates(db, batch_size: int = EXPIRY_BATCH_SIZE):
+    """Fill closes_on for jobs saved before it existed"""
+    last_id = 0
+    while True:
+        rows = db.query(models.Job.id, models.Job.last_date).filter(
+            models.Job.closes_on.is_(None),
+            models.Job.last_date.isnot(None),
+            models.Job.id > last_id,
+        ).order_by(models.Job.id).limit(batch_size).all()
+        if not rows:
+            return
+        values = [{"id": row.id, "closes_on": parse_last_date(row.last_date)} for row in rows]
+        values = [v for v in values if v["closes_on"]]
+        if values:
+            db.execute(update(models.Job), values)
+            db.commit()
+        last_id = rows[-1].id
+
+
+def sweep_expired_jobs(today: datetime.date = None, batch_size: int = EXPIRY_BATCH_SIZE,
+                       session_factory=SessionLocal) -> int:
+    """Deactivate active jobs that closed before `today`; returns how many"""
+    today = today or datetime.datetime.utcnow().date()
+    swept = 0
+    with session_factory() as db:
+        while True:
+            expired = db.query(models.Job).filter(
+                models.Job.closes_on < today,
+                models.Job.is_active == True,
+            ).order_by(models.Job.closes_on).limit(batch_size)
+            if db.query(expired.exists()).scalar() is not True:
+                break
+            # Select the batch only once the version bump holds the write lock, so a
+            # sweep in another worker can't deactivate (and un-count) the same jobs
+            change_seq = bump_catalog_version(db)
+            jobs = expired.with_for_update().all()
+            if not jobs:
+                db.rollback()
+                break
+            changes = []
+            for job in jobs:
+                changes.append((job, facets.job_facets(job)))
+                job.is_active = False
+                job.change_seq = change_seq
+            facets.sync_many_job_facets(db, changes)
+            db.commit()
+            swept += len(jobs)
+    if swept:
+        response_cache.invalidate()
+    return swept
+
+
+expiry_sweeper = PeriodicTask("job-expiry-sweeper", sweep_expired_jobs, EXPIRY_SWEEP_INTERVAL,
+                              run_first=True)
+
+
+def start_expiry_sweeper(interval: float = EXPIRY_SWEEP_INTERVAL):
+    """Sweep expired jobs now and then every `interval` seconds in a daemon thread"""
+    expiry_sweeper.start(interval)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Streaming export of jobs and visit logs
+
+Rows are read with yield_per from a server-side cursor and encoded one
+chunk at a time, so memory stays flat however many rows are exported.
+Used by the /api/admin/export endpoint and as a CLI:
+
+    python export.py user_visits --format csv --start 2026-01-01 --gzip -o visits.csv.gz
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import sys
+import zlib
+
+from fastapi.concurrency import iterate_in_threadpool
+from sqlalchemy import false, func, select
+
+import models
+from database import SessionLocal
+
+EXPORT_BATCH_SIZE = 2000
+
+# table name -> (FROM clause, column used for time-range filters, exported columns)
+EXPORTS = {
+    "jobs": (models.Job.__table__, models.Job.created_at, list(models.Job.__table__.columns)),
+    "user_visits": (
+        models.UserVisit.__table__.outerjoin(
+            models.UserAgent.__table__, models.UserVisit.user_agent_id == models.UserAgent.id
+        ),
+        models.UserVisit.visited_at,
+        [
+            models.UserVisit.id,
+            models.UserVisit.ip_address,
+            # Legacy rows still carry the string inline
+            func.coalesce(models.UserAgent.value, models.UserVisit.user_agent).label("user_agent"),
+            func.coalesce(models.UserAgent.is_bot, false()).label("is_bot"),
+            models.UserVisit.visited_at,
+            models.UserVisit.job_id,
+            models.UserVisit.weight,
+        ],
+    ),
+}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def export_columns(table: str) -> list:
+    return [column.name for column in EXPORTS[table][2]]
+
+
+def iter_rows(table: str, start: datetime.datetime = None, end: datetime.datetime = None,
+              session_factory=SessionLocal):
+    """Yield every row of `table` in [start, end), in id order"""
+    source, time_column, columns = EXPORTS[table]
+    stmt = select(*columns).select_from(source).order_by(columns[0])
+    if start:
+        stmt = stmt.where(time_column >= start)
+    if end:
+        stmt = stmt.where(time_column < end)
+
+    with session_factory() as db:
+        result = db.execute(stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+        for row in result:
+            yield row
+
+
+def iter_encoded(table: str, fmt: str = "ndjson", start=None, end=None, compress: bool = False,
+                 session_factory=SessionLocal):
+    """Yield the export as byte chunks of NDJSON or CSV, optionally gzipped"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    columns = export_columns(table)
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+    pending = 0
+
+    def flush():
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    for row in iter_rows(table, start, end, session_factory):
+        if writer:
+            writer.writerow([_value(value) for value in row])
+        else:
+            buffer.write(json.dumps({c: _value(v) for c, v in zip(columns, row)}) + "\n")
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            pending = 0
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+async def close_on_disconnect(chunks):
+    """Stream `chunks` from the threadpool, closing it when the client goes away
+
+    Starlette stops reading a generator whose client disconnected but never
+    closes it, which would hold its session and cursor open until collected.
+    """
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def parse_time(value: str):
+    """Parse an ISO date or datetime given on the command line or query string"""
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream jobs or user_visits as NDJSON or CSV")
+    parser.add_argument("table", choices=sorted(EXPORTS))
+    parser.add_argument("--format", default="ndjson", choices=sorted(FORMATS))
+    parser.add_argument("--start", type=parse_time, help="inclusive ISO date/datetime")
+    parser.add_argument("--end", type=parse_time, help="exclusive ISO date/datetime")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_encoded(args.table, args.format, args.start, args.end, args.gzip):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Incrementally maintained search facets
+
+Each active job contributes its experience buckets and its location to
+`facet_counts`; job writes adjust the counts instead of /api/years and
+/api/locations re-reading every job. The number of active jobs is kept the
+same way, in the active_jobs stat counter, for /api/stats.
+"""
+import re
+from collections import Counter
+
+from sqlalchemy import case, update
+
+import models
+import stats
+from database import pin_to_writer
+
+YEARS = "years"
+LOCATION = "location"
+# Every active job has this pair; it feeds stats.ACTIVE_JOBS, not facet_counts
+ACTIVE = ("active", "")
+
+# Upper bound stored for open-ended buckets such as "5+"
+OPEN_ENDED_YEARS = 99
+
+_RANGE = re.compile(r"^(\d+)\s*(?:-|to)\s*(\d+)")
+_AT_LEAST = re.compile(r"^(\d+)\s*\+")
+_EXACT = re.compile(r"^(\d+)(?:\s*(?:years?|yrs?))?$")
+
+
+def parse_year_buckets(eligible_years: str) -> list:
+    """Split an eligible_years string such as "0-2, 2-5, 5+" into buckets"""
+    if not eligible_years:
+        return []
+    buckets = []
+    for bucket in str(eligible_years).split(","):
+        bucket = bucket.strip()
+        if bucket and bucket not in buckets:
+            buckets.append(bucket)
+    return buckets
+
+
+def parse_experience_range(bucket: str):
+    """(min_years, max_years) of a bucket such as "0-2", "5+" or "3 years", or (None, None)"""
+    text = bucket.strip().lower()
+    if text.startswith("fresher"):
+        return 0, 0
+    match = _RANGE.match(text)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        return min(low, high), max(low, high)
+    match = _AT_LEAST.match(text)
+    if match:
+        return int(match.group(1)), OPEN_ENDED_YEARS
+    match = _EXACT.match(text)
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    return None, None
+
+
+def _job_year(job_id: int, bucket: str):
+    min_years, max_years = parse_experience_range(bucket)
+    return models.JobYear(job_id=job_id, bucket=bucket, min_years=min_years, max_years=max_years)
+
+
+def job_facets(job) -> set:
+    """(facet, value) pairs a job currently counts towards"""
+    if not job.is_active:
+        return set()
+    pairs = {ACTIVE}
+    pairs.update((YEARS, bucket) for bucket in parse_year_buckets(job.eligible_years))
+    if job.location and job.location.strip():
+        pairs.add((LOCATION, job.location.strip()))
+    return pairs
+
+
+def _bump(db, facet: str, value: str, delta: int):
+    count = models.FacetCount.active_count + delta
+    result = db.execute(
+        update(models.FacetCount)
+        .where(models.FacetCount.facet == facet, models.FacetCount.value == value)
+        .values(active_count=case((count < 0, 0), else_=count))
+    )
+    if result.rowcount == 0:
+        db.add(models.FacetCount(facet=facet, value=value, active_count=max(delta, 0)))
+        db.flush()
+
+
+def sync_job_facets(db, job, before: set = frozenset()):
+    """Apply the facet changes of a job write; `before` is job_facets() prior to it"""
+    sync_many_job_facets(db, [(job, before)])
+
+
+def sync_many_job_facets(db, changes: list):
+    """Apply facet changes for several written jobs; `changes` is [(job, before)]"""
+    pin_to_writer(db)
+    deltas = Counter()
+    for job, before in changes:
+        after = job_facets(job)
+        deltas.update(after - before)
+        deltas.subtract(before - after)
+
+        buckets = {value for facet, value in after if facet == YEARS}
+        old_buckets = {value for facet, value in before if facet == YEARS}
+        if buckets != old_buckets:
+            if old_buckets:
+                db.query(models.JobYear).filter(models.JobYear.job_id == job.id).delete()
+            db.add_all(_job_year(job.id, bucket) for bucket in buckets)
+
+    active_delta = deltas.pop(ACTIVE, 0)
+    if active_delta:
+        stats.add_counter(db, stats.ACTIVE_JOBS, active_delta)
+    for (facet, value), delta in deltas.items():
+        if delta:
+            _bump(db, facet, value, delta)
+
+
+def rebuild_facets(db):
+    """Recompute all facet rows from the jobs table"""
+    db.query(models.JobYear).delete()
+    db.query(models.FacetCount).delete()
+    jobs = db.query(
+        models.Job.id, models.Job.eligible_years, models.Job.location, models.Job.is_active
+    ).filter(models.Job.is_active == True).all()
+
+    counts = Counter()
+    for job in jobs:
+        pairs = job_facets(job)
+        counts.update(pairs)
+        db.add_all(_job_year(job.id, value) for facet, value in pairs if facet == YEARS)
+    db.query(models.StatCounter).filter(models.StatCounter.key == stats.ACTIVE_JOBS).delete()
+    db.add(models.StatCounter(key=stats.ACTIVE_JOBS, value=counts.pop(ACTIVE, 0)))
+    db.add_all(
+        models.FacetCount(facet=facet, value=value, active_count=count)
+        for (facet, value), count in counts.items()
+    )
+    db.commit()
+
+
+def backfill_facets(db):
+    """Build facet rows for an existing catalog the first time they are needed"""
+    has_facets = db.query(models.FacetCount.facet).first() is not None
+    has_jobs = db.query(models.Job.id).filter(models.Job.is_active == True).first() is not None
+    if has_jobs and not has_facets:
+        rebuild_facets(db)
+
+
+def backfill_experience_bounds(db):
+    """Fill min/max years for job_years rows written before the bounds existed"""
+    buckets = db.query(models.JobYear.bucket).filter(models.JobYear.min_years.is_(None)).distinct().all()
+    for (bucket,) in buckets:
+        min_years, max_years = parse_experience_range(bucket)
+        if min_years is not None:
+            db.query(models.JobYear).filter(models.JobYear.bucket == bucket).update(
+                {"min_years": min_years, "max_years": max_years}, synchronize_session=False
+            )
+    db.commit()
+
+
+def experience_job_ids(db, years: int):
+    """Subquery of job ids with a bucket covering `years` of experience (range index)"""
+    return db.query(models.JobYear.job_id).filter(
+        models.JobYear.min_years <= years,
+        models.JobYear.max_years >= years,
+    )
+
+
+def bucket_job_ids(db, bucket: str):
+    """Subquery of job ids listing exactly this experience bucket"""
+    return db.query(models.JobYear.job_id).filter(models.JobYear.bucket == bucket.strip())
+
+
+def facet_values(db, facet: str) -> list:
+    """Values of a facet that have at least one active job, with their counts"""
+    rows = db.query(models.FacetCount.value, models.FacetCount.active_count).filter(
+        models.FacetCount.facet == facet,
+        models.FacetCount.active_count > 0
+    ).order_by(models.FacetCount.value)
+    return [{"value": value, "count": count} for value, count in rows]
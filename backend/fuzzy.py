@@ -0,0 +1,109 @@
+"""
+Typo-tolerant matching on job titles and companies
+
+FuzzyIndex maps every trigram to the distinct terms (whole titles and
+company names, and their words) that contain it. A query only visits the
+terms sharing one of its trigrams, scores each by trigram similarity
+(shared / union, as pg_trgm does) and keeps the jobs of terms at or above
+the threshold. The work depends on how many distinct terms share the
+query's trigrams, not on the size of the catalog.
+"""
+import os
+import re
+from collections import Counter
+
+import models
+from catalog_index import CatalogIndex
+
+DEFAULT_THRESHOLD = 0.3
+FUZZY_MAX_RESULTS = int(os.getenv("FUZZY_MAX_RESULTS", "1000"))
+MIN_WORD_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+
+def trigrams(text: str) -> frozenset:
+    """Trigrams of a normalized string, each word padded like pg_trgm ("  ab", "ab ")"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class FuzzyIndex(CatalogIndex):
+    columns = (models.Job.id, models.Job.job_name, models.Job.company)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._clear()
+
+    def _clear(self):
+        self.term_jobs = {}      # term -> job ids
+        self.term_size = {}      # term -> number of trigrams
+        self.trigram_terms = {}  # trigram -> terms
+
+    def _terms(self, job) -> set:
+        terms = set()
+        for value in (job.job_name, job.company):
+            text = normalize(value)
+            if text:
+                terms.add(text)
+                terms.update(word for word in text.split() if len(word) >= MIN_WORD_LENGTH)
+        return terms
+
+    def _add(self, job):
+        for term in self._terms(job):
+            jobs = self.term_jobs.get(term)
+            if jobs is None:
+                jobs = self.term_jobs[term] = set()
+                grams = trigrams(term)
+                self.term_size[term] = len(grams)
+                for gram in grams:
+                    self.trigram_terms.setdefault(gram, set()).add(term)
+            jobs.add(job.id)
+
+    def _remove(self, job):
+        for term in self._terms(job):
+            jobs = self.term_jobs.get(term)
+            if jobs is None:
+                continue
+            jobs.discard(job.id)
+            if jobs:
+                continue
+            del self.term_jobs[term]
+            del self.term_size[term]
+            for gram in trigrams(term):
+                terms = self.trigram_terms.get(gram)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.trigram_terms[gram]
+
+    def search(self, q: str, threshold: float = DEFAULT_THRESHOLD, limit: int = FUZZY_MAX_RESULTS) -> dict:
+        """{job id: similarity} for jobs whose title or company resembles `q`, best `limit` only"""
+        self.refresh()
+        query_grams = trigrams(normalize(q))
+        if not query_grams:
+            return {}
+        scores = {}
+        with self.lock:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self.trigram_terms.get(gram, ()))
+            for term, common in shared.items():
+                similarity = common / (len(query_grams) + self.term_size[term] - common)
+                if similarity < threshold:
+                    continue
+                for job_id in self.term_jobs[term]:
+                    if similarity > scores.get(job_id, 0.0):
+                        scores[job_id] = similarity
+        if len(scores) > limit:
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            scores = dict(best)
+        return scores
+
+
+fuzzy_index = FuzzyIndex()
@@ -1,19 +1,48 @@
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc
+from typing import Any, Optional, Union
 import models
 import schemas
-from database import engine, get_db
-from auth import hash_password, verify_password, create_access_token, verify_token
+from database import engine, read_engine, get_db, pin_to_writer
+from auth import (
+    default_admin_hash, verify_password, create_access_token, verify_token, logout_token,
+    start_revocation_sweeper, token_secret
+)
+from visits import visit_writer
+from search_index import apply_text_search
+from pagination import (
+    DEFAULT_CHANGES_PAGE_SIZE, DEFAULT_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, MAX_PAGE_SIZE,
+    job_changes, job_listing_query, paginate_jobs, ranked_result, summary_result
+)
+import facets
+import stats
+from cache import bump_catalog_version, response_cache
+import metrics
+import export
+import bulk_import
+import static_assets
+import trending
+import expiry
+import ratelimit
+import migrate
+import periodic
+from suggest import SUGGEST_MAX_RESULTS, suggest_index
+import fuzzy as fuzzy_search
+from stats_stream import stats_publisher
+import csv
+import datetime
 import os
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
-
 app = FastAPI(title="Job Portal API")
 
+# Per-IP token buckets (innermost, so 429s still get CORS headers and metrics)
+app.add_middleware(ratelimit.RateLimitMiddleware)
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,21 +55,100 @@ app.add_middleware(
 # Add GZip middleware for compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Per-route latency, SQL counts and Server-Timing (outermost, so it times everything)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.registry.register("db_pool_connections", "Connection pool usage",
+                          metrics.pool_gauges("writer", engine))
+if read_engine is not engine:
+    metrics.instrument_engine(read_engine)
+    metrics.registry.register("db_pool_connections", "Connection pool usage",
+                              metrics.pool_gauges("reader", read_engine))
+metrics.registry.register("visit_queue_depth", "Visits waiting to be written",
+                          lambda: [({}, visit_writer.depth())])
+metrics.registry.register("visit_writer_rows_total", "Visit rows by outcome", lambda: [
+    ({"outcome": "written"}, visit_writer.written),
+    ({"outcome": "dropped"}, visit_writer.dropped),
+    ({"outcome": "skipped"}, visit_writer.skipped),
+    ({"outcome": "failed"}, visit_writer.failed),
+], kind="counter")
+metrics.registry.register("stats_stream_subscribers", "Open /api/stats/stream connections",
+                          lambda: [({}, len(stats_publisher.subscribers))])
+metrics.registry.register("response_cache_requests_total", "Response cache lookups by result",
+                          lambda: [
+                              ({"result": "hit"}, response_cache.hits),
+                              ({"result": "miss"}, response_cache.misses),
+                              ({"result": "not_modified"}, response_cache.not_modified),
+                          ], kind="counter")
+
+# Schema changes run once per deploy (python migrate.py), not in every worker
+@app.on_event("startup")
+def check_migrations():
+    missing = migrate.pending()
+    if missing and AUTO_MIGRATE:
+        migrate.run()
+    elif missing:
+        raise RuntimeError(
+            f"{len(missing)} pending database migration(s); run `python migrate.py` first"
+        )
+
+@app.on_event("startup")
+def load_token_secret():
+    token_secret()
+
+@app.on_event("startup")
+def start_visit_writer():
+    visit_writer.start()
+
+@app.on_event("startup")
+def load_trending():
+    trending.rebuild()
+    trending.start_trending_reloader()
+
+@app.on_event("startup")
+def load_suggest_index():
+    suggest_index.refresh()
+    fuzzy_search.fuzzy_index.refresh()
+
+@app.on_event("startup")
+def start_expiry_sweeper():
+    expiry.start_expiry_sweeper()
+
+@app.on_event("startup")
+def start_token_sweeper():
+    start_revocation_sweeper()
+
+@app.on_event("shutdown")
+def stop_visit_writer():
+    visit_writer.stop()
+
+@app.on_event("shutdown")
+def stop_periodic_tasks():
+    periodic.stop_all()
+
 # Admin credentials
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
-DEFAULT_ADMIN_HASH = hash_password(ADMIN_PASSWORD)
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+
+JOB_LIST_RESPONSE = Union[list[schemas.JobResponse], schemas.JobPage]
+JOB_LISTING_MODELS = Union[JOB_LIST_RESPONSE, list[schemas.JobSummary], schemas.JobSummaryPage]
+SCORED_LIST_RESPONSE = Union[list[schemas.ScoredJob], schemas.ScoredJobPage]
+SEARCH_MODELS = Union[
+    JOB_LISTING_MODELS, SCORED_LIST_RESPONSE,
+    list[schemas.ScoredJobSummary], schemas.ScoredJobSummaryPage
+]
+FIELDS_PATTERN = "^(full|summary)$"
 
 # ===================== HELPER FUNCTIONS =====================
 
-def track_visit(request: Request, db: Session, job_id: int = None):
-    """Track user visits"""
+def track_visit(request: Request, endpoint: str, job_id: int = None):
+    """Track user visits (bots filtered, sampled per endpoint, batched by visit_writer)"""
     try:
         ip = request.client.host if request.client else "unknown"
         user_agent = request.headers.get("user-agent", "unknown")
-        visit = models.UserVisit(ip_address=ip, user_agent=user_agent, job_id=job_id)
-        db.add(visit)
-        db.commit()
+        visit_writer.track(ip, user_agent, endpoint, job_id)
     except:
         pass  # Don't block requests
 
@@ -59,19 +167,27 @@ def get_current_admin(token: str = None) -> int:
 def admin_login(credentials: schemas.AdminLogin, request: Request, db: Session = Depends(get_db)):
     """Admin login"""
     try:
-        track_visit(request, db)
+        track_visit(request, "login")
     except:
         pass
     
-    if credentials.username == ADMIN_USERNAME and (credentials.password == ADMIN_PASSWORD or verify_password(credentials.password, DEFAULT_ADMIN_HASH)):
+    password_ok = credentials.password == ADMIN_PASSWORD or verify_password(
+        credentials.password, default_admin_hash(ADMIN_PASSWORD)
+    )
+    if credentials.username == ADMIN_USERNAME and password_ok:
         # Get or create admin
-        admin = db.query(models.Admin).filter(models.Admin.username == credentials.username).first()
+        by_username = models.Admin.username == credentials.username
+        admin = db.query(models.Admin).filter(by_username).first()
+        if not admin:
+            # Look again on the writer, where another worker may have just created it
+            pin_to_writer(db)
+            admin = db.query(models.Admin).filter(by_username).first()
         
         if not admin:
             admin = models.Admin(
                 username=credentials.username,
                 email=f"{credentials.username}@manaworks.online",
-                password=DEFAULT_ADMIN_HASH
+                password=default_admin_hash(ADMIN_PASSWORD)
             )
             db.add(admin)
             db.commit()
@@ -82,6 +198,12 @@ def admin_login(credentials: schemas.AdminLogin, request: Request, db: Session =
     
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
+@app.post("/api/admin/logout")
+def admin_logout(token: str):
+    """Revoke an admin token"""
+    logout_token(token)
+    return {"message": "Logged out"}
+
 @app.get("/api/admin/verify")
 def verify_admin(token: str):
     """Verify admin token"""
@@ -106,47 +228,117 @@ def create_job(job: schemas.JobCreate, token: str, db: Session = Depends(get_db)
         link=job.link,
         location=job.location,
         last_date=job.last_date,
-        admin_id=admin_id
+        closes_on=expiry.parse_last_date(job.last_date),
+        admin_id=admin_id,
+        change_seq=bump_catalog_version(db)
     )
     db.add(db_job)
+    db.flush()
+    facets.sync_job_facets(db, db_job)
     db.commit()
+    response_cache.invalidate()
     db.refresh(db_job)
     return db_job
 
-@app.get("/api/jobs", response_model=list[schemas.JobResponse])
-def get_all_jobs(request: Request, db: Session = Depends(get_db)):
-    """Get all active jobs"""
+@app.post("/api/jobs/bulk")
+async def bulk_create_jobs(request: Request, token: str, upsert: bool = False):
+    """Create many jobs from a JSON array or a CSV upload (field "file")"""
+    admin_id = get_current_admin(token)
+    
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Upload the CSV in a 'file' field")
+            rows = bulk_import.parse_csv(await upload.read())
+        elif "csv" in content_type:
+            rows = bulk_import.parse_csv(await request.body())
+        else:
+            rows = await request.json()
+    except (ValueError, csv.Error):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or a CSV file")
+    
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or a CSV file")
+    if len(rows) > bulk_import.MAX_BULK_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {bulk_import.MAX_BULK_ROWS} rows per request"
+        )
+    
+    result = await run_in_threadpool(bulk_import.import_jobs, rows, admin_id, upsert)
+    response_cache.invalidate()
+    return result
+
+@app.get("/api/jobs", response_model=JOB_LISTING_MODELS)
+def get_all_jobs(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: str = Query("full", pattern=FIELDS_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """Get all active jobs (one page of them when limit or cursor is given)"""
     try:
-        track_visit(request, db)
+        track_visit(request, "jobs")
     except:
         pass
     
-    jobs = db.query(models.Job).filter(
-        models.Job.is_active == True
-    ).order_by(desc(models.Job.created_at)).all()
-    return jobs
+    def load():
+        query = job_listing_query(db, fields)
+        if limit or cursor:
+            result = paginate_jobs(query, limit or DEFAULT_PAGE_SIZE, cursor)
+        else:
+            result = query.order_by(desc(models.Job.created_at)).all()
+        return summary_result(result) if fields == "summary" else result
+    
+    return response_cache.respond(request, load, JOB_LIST_RESPONSE if fields == "full" else Any)
+
+@app.get("/api/jobs/changes", response_model=schemas.JobChanges)
+def get_job_changes(
+    since: Optional[str] = None,
+    limit: int = Query(DEFAULT_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Jobs created or updated after a sync token, plus tombstones for deleted ones"""
+    return job_changes(db, since, limit)
+
+@app.get("/api/jobs/trending", response_model=list[schemas.TrendingJob])
+def get_trending_jobs(
+    window: str = Query("24h", pattern="^(1h|24h)$"),
+    limit: int = Query(10, ge=1, le=trending.TRENDING_TOP_K)
+):
+    """Most viewed active jobs in the last hour or day"""
+    body = trending.trending_body(window, limit, response_cache.version())
+    return Response(content=body, media_type="application/json")
 
 @app.get("/api/jobs/{job_id}", response_model=schemas.JobResponse)
 def get_job(job_id: int, request: Request, db: Session = Depends(get_db)):
     """Get a specific job"""
     try:
-        track_visit(request, db, job_id)
+        track_visit(request, "job", job_id)
     except:
         pass
     
-    job = db.query(models.Job).filter(
-        models.Job.id == job_id,
-        models.Job.is_active == True
-    ).first()
+    def load():
+        job = db.query(models.Job).filter(
+            models.Job.id == job_id,
+            models.Job.is_active == True
+        ).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
     
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    return job
+    return response_cache.respond(request, load, schemas.JobResponse)
 
 @app.put("/api/jobs/{job_id}", response_model=schemas.JobResponse)
-def update_job(job_id: int, job_update: schemas.JobUpdate, token: str, db: Session = Depends(get_db)):
+def update_job(job_id: int, job_update: schemas.JobUpdate, token: str,
+               db: Session = Depends(get_db)):
     """Update a job"""
     admin_id = get_current_admin(token)
+    # Take the write lock before reading the job, so the facet deltas start from its latest state
+    pin_to_writer(db)
+    change_seq = bump_catalog_version(db)
     
     job = db.query(models.Job).filter(
         models.Job.id == job_id,
@@ -156,11 +348,17 @@ def update_job(job_id: int, job_update: schemas.JobUpdate, token: str, db: Sessi
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    before = facets.job_facets(job)
     update_data = job_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(job, field, value)
+    if "last_date" in update_data:
+        job.closes_on = expiry.parse_last_date(job.last_date)
+    facets.sync_job_facets(db, job, before)
+    job.change_seq = change_seq
     
     db.commit()
+    response_cache.invalidate()
     db.refresh(job)
     return job
 
@@ -168,6 +366,8 @@ def update_job(job_id: int, job_update: schemas.JobUpdate, token: str, db: Sessi
 def delete_job(job_id: int, token: str, db: Session = Depends(get_db)):
     """Delete a job"""
     admin_id = get_current_admin(token)
+    pin_to_writer(db)
+    change_seq = bump_catalog_version(db)  # Write lock first, as in update_job
     
     job = db.query(models.Job).filter(
         models.Job.id == job_id,
@@ -177,101 +377,180 @@ def delete_job(job_id: int, token: str, db: Session = Depends(get_db)):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
+    before = facets.job_facets(job)
     job.is_active = False
+    facets.sync_job_facets(db, job, before)
+    job.change_seq = change_seq
     db.commit()
+    response_cache.invalidate()
     return {"message": "Job deleted successfully"}
 
 # ===================== SEARCH ENDPOINTS =====================
 
-@app.get("/api/search", response_model=list[schemas.JobResponse])
+@app.get("/api/search", response_model=SEARCH_MODELS)
 def search_jobs(
     q: str = "",
+    fuzzy: bool = False,
+    threshold: float = Query(fuzzy_search.DEFAULT_THRESHOLD, ge=0, le=1),
     years: str = "",
+    experience: Optional[int] = Query(None, ge=0),
     location: str = "",
+    closing_before: Optional[datetime.date] = None,
+    closing_after: Optional[datetime.date] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: str = Query("full", pattern=FIELDS_PATTERN),
     request: Request = None,
     db: Session = Depends(get_db)
 ):
-    """Search jobs"""
+    """Search jobs (ranked by relevance, or newest first when paginated)
+
+    With fuzzy=true, q is matched against titles and companies by trigram
+    similarity instead of full-text search, so misspellings still match.
+    Fuzzy results are ranked by similarity, paginated or not, and each
+    carries its score.
+    """
     if request:
         try:
-            track_visit(request, db)
+            track_visit(request, "search")
         except:
             pass
     
-    query = db.query(models.Job).filter(models.Job.is_active == True)
-    
-    if q:
-        search_term = f"%{q}%"
-        query = query.filter(
-            (models.Job.job_name.ilike(search_term)) |
-            (models.Job.company.ilike(search_term)) |
-            (models.Job.job_description.ilike(search_term))
-        )
-    
-    if years:
-        query = query.filter(models.Job.eligible_years.ilike(f"%{years}%"))
-    
-    if location:
-        query = query.filter(models.Job.location.ilike(f"%{location}%"))
+    def load():
+        query = job_listing_query(db, fields)
+        
+        paginated = bool(limit or cursor)
+        
+        scores = None
+        if q and fuzzy:
+            scores = fuzzy_search.fuzzy_index.search(q, threshold)
+            query = query.filter(models.Job.id.in_(list(scores)))
+        elif q:
+            query = apply_text_search(query, q, engine.dialect.name, ranked=not paginated)
+        
+        # Experience filters go through the indexed job_years table
+        if years:
+            query = query.filter(models.Job.id.in_(facets.bucket_job_ids(db, years)))
+        
+        if experience is not None:
+            query = query.filter(models.Job.id.in_(facets.experience_job_ids(db, experience)))
+        
+        if location:
+            query = query.filter(models.Job.location.ilike(f"%{location}%"))
+        
+        # Inclusive bounds on the indexed closing date
+        if closing_before:
+            query = query.filter(models.Job.closes_on <= closing_before)
+        
+        if closing_after:
+            query = query.filter(models.Job.closes_on >= closing_after)
+        
+        if scores is not None:
+            # At most FUZZY_MAX_RESULTS rows, ranked and paged in memory
+            return ranked_result(query.all(), scores, limit, cursor)
+        if paginated:
+            result = paginate_jobs(query, limit or DEFAULT_PAGE_SIZE, cursor)
+        else:
+            result = query.order_by(desc(models.Job.created_at)).all()
+        return summary_result(result) if fields == "summary" else result
     
-    jobs = query.order_by(desc(models.Job.created_at)).all()
-    return jobs
+    if fields == "summary":
+        response_type = Any
+    else:
+        response_type = SCORED_LIST_RESPONSE if q and fuzzy else JOB_LIST_RESPONSE
+    return response_cache.respond(request, load, response_type)
+
+@app.get("/api/suggest")
+def suggest(prefix: str = "", limit: int = Query(8, ge=1, le=SUGGEST_MAX_RESULTS)):
+    """Typeahead: job titles, companies and locations starting with `prefix`"""
+    return Response(content=suggest_index.suggest_body(prefix, limit),
+                    media_type="application/json")
 
 @app.get("/api/years")
-def get_available_years(db: Session = Depends(get_db)):
-    """Get all available years"""
-    jobs = db.query(models.Job.eligible_years).filter(
-        models.Job.is_active == True,
-        models.Job.eligible_years.isnot(None)
-    ).all()
-    
-    years_set = set()
-    for job in jobs:
-        if job.eligible_years:
-            years_list = [y.strip() for y in str(job.eligible_years).split(",")]
-            years_set.update(years_list)
-    
-    return sorted(list(years_set))
+def get_available_years(request: Request, db: Session = Depends(get_db)):
+    """Get all available years with their active job counts"""
+    return response_cache.respond(request, lambda: facets.facet_values(db, facets.YEARS))
 
 @app.get("/api/locations")
-def get_available_locations(db: Session = Depends(get_db)):
-    """Get all available locations"""
-    locations = db.query(models.Job.location).filter(
-        models.Job.is_active == True,
-        models.Job.location.isnot(None)
-    ).all()
-    
-    return [loc[0] for loc in locations if loc[0]]
+def get_available_locations(request: Request, db: Session = Depends(get_db)):
+    """Get all available locations with their active job counts"""
+    return response_cache.respond(request, lambda: facets.facet_values(db, facets.LOCATION))
 
 # ===================== STATISTICS ENDPOINTS =====================
 
 @app.get("/api/stats")
-def get_stats(request: Request, db: Session = Depends(get_db)):
-    """Get statistics"""
-    try:
-        track_visit(request, db)
-    except:
-        pass
-    
-    total_visits = db.query(func.count(models.UserVisit.id)).scalar() or 0
-    unique_visitors = db.query(func.count(func.distinct(models.UserVisit.ip_address))).scalar() or 0
-    total_jobs = db.query(func.count(models.Job.id)).filter(models.Job.is_active == True).scalar() or 0
-    
+def get_stats(db: Session = Depends(get_db)):
+    """Get statistics (served from rollup counters)"""
     return {
-        "total_visits": total_visits,
-        "unique_visitors": unique_visitors,
-        "total_jobs": total_jobs
+        "total_visits": stats.get_counter(db, stats.TOTAL_VISITS),
+        "unique_visitors": stats.unique_visitors(db),
+        "total_jobs": stats.get_counter(db, stats.ACTIVE_JOBS)
     }
 
+@app.get("/api/stats/stream")
+def stream_stats():
+    """Server-Sent Events: a stats snapshot, then deltas at most once per second"""
+    return StreamingResponse(
+        stats_publisher.events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Marks the body as final so GZipMiddleware doesn't buffer the events
+            "Content-Encoding": "identity",
+        }
+    )
+
 @app.get("/api/stats/jobs/{job_id}")
 def get_job_stats(job_id: int, db: Session = Depends(get_db)):
     """Get job statistics"""
-    views = db.query(func.count(models.UserVisit.id)).filter(
-        models.UserVisit.job_id == job_id
-    ).scalar() or 0
+    views = stats.get_counter(db, stats.job_views_key(job_id))
     
     return {"job_id": job_id, "views": views}
 
+@app.post("/api/admin/stats/recompute")
+def recompute_stats(token: str, db: Session = Depends(get_db)):
+    """Rebuild the stats rollups exactly from the raw visits table"""
+    get_current_admin(token)
+    return stats.recompute_stats(db)
+
+# ===================== EXPORT ENDPOINTS =====================
+
+@app.get("/api/admin/export/{table}")
+def export_table(
+    table: str,
+    token: str,
+    format: str = "ndjson",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    gzip: bool = False
+):
+    """Stream jobs or user_visits as NDJSON or CSV"""
+    get_current_admin(token)
+    
+    if table not in export.EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    try:
+        start_at, end_at = export.parse_time(start), export.parse_time(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be ISO dates")
+    
+    filename = f"{table}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export.close_on_disconnect(export.iter_encoded(table, format, start_at, end_at, gzip)),
+        media_type="application/gzip" if gzip else export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ===================== METRICS =====================
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # ===================== HEALTH CHECK =====================
 
 @app.get("/api/health")
@@ -279,6 +558,14 @@ def health_check():
     """Health check endpoint"""
     return {"status": "OK"}
 
+# ===================== FRONTEND =====================
+
+# Serve the output of frontend/build.py, if present; mounted last so /api routes win
+if os.path.isdir(static_assets.FRONTEND_DIST_DIR):
+    app.mount("/", static_assets.PrecompressedStatic(static_assets.FRONTEND_DIST_DIR),
+              name="frontend")
+
 if __name__ == "__main__":
     import uvicorn
+    migrate.run()
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,212 @@
+"""
+Request timing, SQL counting and Prometheus exposition
+
+MetricsMiddleware times every request into per-route histograms. SQLAlchemy
+engine hooks count queries and SQL time for the request in flight, and
+the middleware reports both in a Server-Timing header. render() produces
+the /api/metrics body in Prometheus text format.
+"""
+import contextvars
+import threading
+import time
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [query count, SQL seconds] for the request being handled
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}    # (method, route) -> Histogram
+        self.requests = {}   # (method, route, status) -> count
+        self.sql_queries = {}  # (method, route) -> count
+        self.sql_seconds = {}  # (method, route) -> seconds
+        self.counters = {}   # (name, labels) -> value, for other modules
+        self.collectors = []  # (name, help, type, callback returning [(labels, value)])
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, sql):
+        key = (method, route)
+        with self.lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+            status_key = (method, route, status)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.sql_queries[key] = self.sql_queries.get(key, 0) + sql[0]
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + sql[1]
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def register(self, name: str, help_text: str, callback, kind: str = "gauge"):
+        """Expose values read from `callback` at scrape time"""
+        self.collectors.append((name, help_text, kind, callback))
+
+
+registry = Registry()
+
+
+def instrument_engine(engine):
+    """Count queries and SQL time per request on every connection of `engine`"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        sql = _request_sql.get()
+        if sql is not None:
+            sql[0] += 1
+            sql[1] += time.perf_counter() - started
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def pool_gauges(name: str, engine):
+    """Gauge callback reporting a QueuePool's connection counts"""
+    def collect():
+        pool = engine.pool
+        samples = []
+        for stat in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, stat):
+                samples.append(({"pool": name, "stat": stat}, getattr(pool, stat)()))
+        return samples
+    return collect
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming responses pass through untouched"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={sql[1] * 1000:.2f};desc="{sql[0]} queries", '
+                    f"app;dur={elapsed_ms:.2f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_sql.reset(token)
+            route = scope.get("route")
+            registry.record_request(
+                scope["method"], route.path if route else "unmatched", status,
+                time.perf_counter() - started, sql,
+            )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    items = labels.items() if isinstance(labels, dict) else labels
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render() -> str:
+    """Everything in the registry in Prometheus text exposition format"""
+    lines = []
+    with registry.lock:
+        latency = {key: (list(h.counts), h.total, h.sum) for key, h in registry.latency.items()}
+        requests = dict(registry.requests)
+        sql_queries = dict(registry.sql_queries)
+        sql_seconds = dict(registry.sql_seconds)
+        counters = dict(registry.counters)
+
+    lines.append("# HELP http_request_duration_seconds Request latency by route")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    for (method, route), (counts, total, seconds) in sorted(latency.items()):
+        base = {"method": method, "route": route}
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            lines.append(f"http_request_duration_seconds_bucket{_labels({**base, 'le': bound})} {count}")
+        lines.append(f"http_request_duration_seconds_bucket{_labels({**base, 'le': '+Inf'})} {total}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(base)} {seconds:.6f}")
+        lines.append(f"http_request_duration_seconds_count{_labels(base)} {total}")
+
+    lines.append("# HELP http_requests_total Requests by route and status")
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route, status), count in sorted(requests.items()):
+        lines.append(f"http_requests_total{_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+    lines.append("# HELP db_queries_total SQL statements executed, by route")
+    lines.append("# TYPE db_queries_total counter")
+    for (method, route), count in sorted(sql_queries.items()):
+        lines.append(f"db_queries_total{_labels({'method': method, 'route': route})} {count}")
+
+    lines.append("# HELP db_query_seconds_total Time spent in SQL, by route")
+    lines.append("# TYPE db_query_seconds_total counter")
+    for (method, route), seconds in sorted(sql_seconds.items()):
+        lines.append(f"db_query_seconds_total{_labels({'method': method, 'route': route})} {seconds:.6f}")
+
+    names = sorted({name for name, _ in counters})
+    for name in names:
+        lines.append(f"# TYPE {name} counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    # Collectors sharing a name (e.g. one per pool) form a single metric family
+    families = {}
+    for name, help_text, kind, callback in registry.collectors:
+        families.setdefault(name, (help_text, kind, []))[2].append(callback)
+    for name, (help_text, kind, callbacks) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for callback in callbacks:
+            for labels, value in callback():
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
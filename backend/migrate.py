@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Versioned schema migrations
+
+Each step runs once per database, in order, and is recorded in
+schema_migrations. Run this as a deploy step before the workers start;
+workers only check that nothing is pending, so booting one does no DDL
+or backfill work:
+
+    python migrate.py           # apply pending steps
+    python migrate.py --status  # list steps and whether they are applied
+
+Steps must be idempotent against databases created before this runner
+existed, which already have some of the tables and indexes.
+"""
+import argparse
+import datetime
+
+from sqlalchemy import func, insert, inspect, select, update
+
+import auth
+import expiry
+import facets
+import models
+import stats
+import visits
+from database import WriterSessionLocal, engine
+from search_index import ensure_search_index
+
+
+def _create_schema(engine):
+    models.Base.metadata.create_all(bind=engine)
+    models.add_missing_columns(engine)
+    models.create_missing_indexes(engine)
+
+
+def _backfill_facets(engine):
+    with WriterSessionLocal() as db:
+        facets.backfill_facets(db)
+        facets.backfill_experience_bounds(db)
+
+
+def _rebuild_facets(engine):
+    with WriterSessionLocal() as db:
+        facets.rebuild_facets(db)
+
+
+def _backfill_stats(engine):
+    with WriterSessionLocal() as db:
+        stats.backfill_stats(db)
+
+
+def _add_change_seq(engine):
+    models.add_missing_columns(engine)
+    with engine.begin() as conn:
+        conn.execute(update(models.Job).where(models.Job.change_seq.is_(None)).values(change_seq=0))
+    models.create_missing_indexes(engine)
+
+
+def _backfill_closing_dates(engine):
+    with WriterSessionLocal() as db:
+        expiry.backfill_closing_dates(db)
+
+
+def _intern_user_agents(engine, batch_size=10_000):
+    _create_schema(engine)
+    visit = models.UserVisit
+    with engine.begin() as conn:
+        known = set(conn.execute(select(models.UserAgent.value)).scalars())
+        values = conn.execute(select(visit.user_agent).where(visit.user_agent.isnot(None)).distinct()).scalars()
+        new = [{"value": value, "is_bot": visits.is_bot(value)} for value in values if value not in known]
+        if new:
+            conn.execute(insert(models.UserAgent), new)
+        last_id = conn.execute(select(func.max(visit.id))).scalar() or 0
+
+    agent_id = select(models.UserAgent.id).where(models.UserAgent.value == visit.user_agent).scalar_subquery()
+    bot_ids = select(models.UserAgent.id).where(models.UserAgent.is_bot == True)
+    tagged = 0
+    for start in range(0, last_id + 1, batch_size):
+        with engine.begin() as conn:
+            in_batch = (visit.id >= start, visit.id < start + batch_size)
+            conn.execute(update(visit).where(*in_batch, visit.user_agent.isnot(None))
+                         .values(user_agent_id=agent_id, user_agent=None))
+            # Past bot visits are kept as tagged rows that count for nothing
+            tagged += conn.execute(
+                update(visit).where(*in_batch, visit.user_agent_id.in_(bot_ids)).values(weight=0)
+            ).rowcount
+
+    # The rollups were built with those bots counted; rebuild them without
+    if tagged:
+        with WriterSessionLocal() as db:
+            stats.recompute_stats(db)
+
+
+def _generate_token_secret(engine):
+    _create_schema(engine)
+    with WriterSessionLocal() as db:
+        auth.generate_token_secret(db)
+
+
+# (version, name, step); append new steps, never reorder or renumber
+MIGRATIONS = [
+    (1, "create tables, columns and indexes", _create_schema),
+    (2, "full-text search index", ensure_search_index),
+    (3, "backfill facet counts and experience bounds", _backfill_facets),
+    (4, "backfill visit stats rollups", _backfill_stats),
+    (5, "backfill job closing dates", _backfill_closing_dates),
+    (6, "index jobs.updated_at for in-memory catalog indexes", models.create_missing_indexes),
+    (7, "jobs.change_seq for the change feed", _add_change_seq),
+    (8, "user agent lookup table and visit weights", _intern_user_agents),
+    (9, "admin token signing secret", _generate_token_secret),
+    (10, "shared admin token revocations", _create_schema),
+    (11, "active jobs counter", _rebuild_facets),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def applied_versions(engine=engine) -> set:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(models.SchemaMigration.__tablename__):
+            return set()
+        return {row[0] for row in conn.execute(models.SchemaMigration.__table__.select())}
+
+
+def pending(engine=engine) -> list:
+    """Migrations not yet applied to this database, in order"""
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def run(engine=engine, log=print) -> list:
+    """Apply every pending migration; returns the versions applied"""
+    models.SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    done = []
+    for version, name, step in pending(engine):
+        log(f"Applying {version}: {name}")
+        step(engine)
+        with engine.begin() as conn:
+            conn.execute(models.SchemaMigration.__table__.insert().values(
+                version=version, name=name, applied_at=datetime.datetime.utcnow()
+            ))
+        done.append(version)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying any")
+    args = parser.parse_args()
+
+    if args.status:
+        applied = applied_versions()
+        for version, name, _ in MIGRATIONS:
+            print(f"{'applied' if version in applied else 'pending':<8} {version:>3}  {name}")
+        return
+
+    done = run()
+    print(f"Applied {len(done)} migration(s)" if done else "Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, Index, LargeBinary, inspect, text
 from sqlalchemy.sql import func
 from database import Base
 import datetime
@@ -24,16 +24,110 @@ class Job(Base):
     link = Column(String)
     location = Column(String, index=True)
     last_date = Column(String)
+    closes_on = Column(Date, nullable=True, index=True)  # last_date parsed, see expiry.py
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
     admin_id = Column(Integer, index=True)
     is_active = Column(Boolean, default=True, index=True)
+    change_seq = Column(Integer, default=0, nullable=False, index=True)  # catalog version of the last write
+
+    __table_args__ = (
+        # Keyset pagination: WHERE is_active ORDER BY created_at DESC, id DESC
+        Index("ix_jobs_active_created_id", "is_active", created_at.desc(), id.desc()),
+    )
 
 class UserVisit(Base):
     __tablename__ = "user_visits"
     
     id = Column(Integer, primary_key=True, index=True)
     ip_address = Column(String)
-    user_agent = Column(String)
-    visited_at = Column(DateTime, default=datetime.datetime.utcnow)
-    job_id = Column(Integer, nullable=True)
+    user_agent = Column(String)  # Legacy rows only; new rows reference user_agents
+    user_agent_id = Column(Integer, nullable=True)
+    visited_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    job_id = Column(Integer, nullable=True, index=True)
+    # Visits this row stands for: 1/sample rate, or 0 for a tagged bot
+    weight = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+class UserAgent(Base):
+    __tablename__ = "user_agents"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(String, unique=True, nullable=False)
+    is_bot = Column(Boolean, default=False, nullable=False)
+
+class JobYear(Base):
+    __tablename__ = "job_years"
+    
+    job_id = Column(Integer, primary_key=True)
+    bucket = Column(String, primary_key=True, index=True)  # e.g., "0-2"
+    min_years = Column(Integer, nullable=True)  # bucket bounds, see facets.parse_experience_range
+    max_years = Column(Integer, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_job_years_range", "min_years", "max_years"),
+    )
+
+class FacetCount(Base):
+    __tablename__ = "facet_counts"
+    
+    facet = Column(String, primary_key=True)  # "years" or "location"
+    value = Column(String, primary_key=True)
+    active_count = Column(Integer, default=0, nullable=False)
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    key = Column(String, primary_key=True)  # "total_visits" or "job_views:<job_id>"
+    value = Column(Integer, default=0, nullable=False)
+
+class VisitDaily(Base):
+    __tablename__ = "visit_daily"
+    
+    day = Column(Date, primary_key=True)
+    job_id = Column(Integer, primary_key=True, index=True)  # 0 for non-job pages
+    visits = Column(Integer, default=0, nullable=False)
+
+class VisitorSketch(Base):
+    __tablename__ = "visitor_sketches"
+    
+    name = Column(String, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)  # HyperLogLog registers
+
+class AppSetting(Base):
+    __tablename__ = "app_settings"
+    
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    token_id = Column(String, primary_key=True)
+    expires_at = Column(Integer, nullable=False, index=True)  # unix time the token would expire
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True, autoincrement=False)  # see migrate.py
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+def add_missing_columns(engine):
+    """Add columns declared on existing tables (create_all only creates whole tables)"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    default = f" DEFAULT {column.server_default.arg.text}" if column.server_default is not None else ""
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+
+def create_missing_indexes(engine):
+    """Create indexes declared on existing tables (create_all skips them)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
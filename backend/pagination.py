@@ -0,0 +1,174 @@
+"""
+Keyset pagination and list projections for job listings
+
+Pages are ordered by (created_at DESC, id DESC) and the cursor carries the
+last row's key, so fetching page 500 is a single index seek just like page 1.
+The summary projection selects only the columns a job card needs, as plain
+rows, so listings skip job_description and ORM hydration.
+
+The change feed works the same way over (change_seq, id): a sync token is
+the key of the last change a client has seen. Fuzzy matches, at most
+FUZZY_MAX_RESULTS of them, are ranked in memory and paged on
+(score, created_at, id) the same way.
+"""
+import base64
+import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import desc, func, tuple_
+
+import models
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+DEFAULT_CHANGES_PAGE_SIZE = 500
+MAX_CHANGES_PAGE_SIZE = 1000
+
+SUMMARY_PREVIEW_LENGTH = 160
+
+SUMMARY_COLUMNS = (
+    models.Job.id,
+    models.Job.job_name,
+    models.Job.company,
+    models.Job.location,
+    models.Job.eligible_years,
+    models.Job.last_date,
+    models.Job.link,
+    models.Job.created_at,
+    func.substr(models.Job.job_description, 1, SUMMARY_PREVIEW_LENGTH).label("summary"),
+)
+
+
+def job_listing_query(db, fields: str = "full"):
+    """Base query for active jobs: ORM objects, or summary rows"""
+    if fields == "summary":
+        query = db.query(*SUMMARY_COLUMNS)
+    else:
+        query = db.query(models.Job)
+    return query.filter(models.Job.is_active == True)
+
+
+def summary_result(result):
+    """Turn summary rows (a list or a page) into plain dicts, skipping validation"""
+    if isinstance(result, dict):
+        return {**result, "items": [row._asdict() for row in result["items"]]}
+    return [row._asdict() for row in result]
+
+
+def encode_cursor(job) -> str:
+    """Build an opaque cursor from a job's (created_at, id) key"""
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return the (created_at, id) key stored in a cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, job_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate_jobs(query, limit: int, cursor: str = None) -> dict:
+    """Fetch one page of a Job query and the cursor for the next one"""
+    if cursor:
+        created_at, job_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(models.Job.created_at, models.Job.id) < tuple_(created_at, job_id)
+        )
+
+    rows = query.order_by(desc(models.Job.created_at), desc(models.Job.id)).limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def encode_ranked_cursor(score: float, job) -> str:
+    """Build an opaque cursor from a ranked job's (score, created_at, id) key"""
+    raw = f"{score!r}|{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_ranked_cursor(cursor: str):
+    """Return the (score, created_at, id) key stored in a ranked cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, created_at, job_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return float(score), datetime.datetime.fromisoformat(created_at), int(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _row_dict(row) -> dict:
+    if hasattr(row, "_asdict"):
+        return row._asdict()
+    return {column.key: getattr(row, column.key) for column in models.Job.__table__.columns}
+
+
+def ranked_result(rows: list, scores: dict, limit: int = None, cursor: str = None):
+    """Rows as dicts with their score, most similar first (newest first on ties)
+
+    With a limit or cursor, one page of them and the cursor for the next.
+    """
+    def key(row):
+        return scores[row.id], row.created_at, row.id
+
+    ranked = sorted(rows, key=key, reverse=True)
+    paginated = bool(limit or cursor)
+    if cursor:
+        after = decode_ranked_cursor(cursor)
+        ranked = [row for row in ranked if key(row) < after]
+    if paginated:
+        limit = limit or DEFAULT_PAGE_SIZE
+        next_cursor = None
+        if len(ranked) > limit:
+            last = ranked[limit - 1]
+            next_cursor = encode_ranked_cursor(scores[last.id], last)
+        ranked = ranked[:limit]
+    items = [{**_row_dict(row), "score": round(scores[row.id], 4)} for row in ranked]
+    return {"items": items, "next_cursor": next_cursor} if paginated else items
+
+
+def encode_sync_token(change_seq: int, job_id: int) -> str:
+    raw = f"{change_seq}|{job_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str):
+    """Return the (change_seq, id) key stored in a sync token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        change_seq, job_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return int(change_seq), int(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def job_changes(db, since: str = None, limit: int = DEFAULT_CHANGES_PAGE_SIZE) -> dict:
+    """Jobs written after a sync token, tombstones for deactivated ones, and the next token
+
+    Without a token this is a full sync: active jobs only, since the client
+    has nothing to delete.
+    """
+    query = db.query(models.Job)
+    key = (0, 0)
+    if since:
+        key = decode_sync_token(since)
+        query = query.filter(tuple_(models.Job.change_seq, models.Job.id) > tuple_(*key))
+
+    rows = query.order_by(models.Job.change_seq, models.Job.id).limit(limit + 1).all()
+    batch = rows[:limit]
+    if batch:
+        key = (batch[-1].change_seq, batch[-1].id)
+
+    return {
+        "changes": [job for job in batch if job.is_active],
+        "deleted": [
+            {"id": job.id, "deleted_at": job.updated_at} for job in batch if not job.is_active and since
+        ],
+        "next_token": encode_sync_token(*key),
+        "has_more": len(rows) > limit,
+    }
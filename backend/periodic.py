@@ -0,0 +1,55 @@
+"""
+Periodic background work
+
+Each worker keeps a few maintenance loops in daemon threads: the job expiry
+sweep, the token revocation refresh and sweep, and the trending catch-up.
+They all run on PeriodicTask, which owns the thread, the sleep between runs
+and the event that stops it.
+"""
+import threading
+
+TASKS = []
+
+
+class PeriodicTask:
+    """Call `target` every `interval` seconds in a daemon thread until stopped"""
+
+    def __init__(self, name: str, target, interval: float, run_first: bool = False):
+        self.name = name
+        self.target = target
+        self.interval = interval
+        self.run_first = run_first
+        self._stop = threading.Event()
+        self._thread = None
+        TASKS.append(self)
+
+    def start(self, interval: float = None):
+        if interval is not None:
+            self.interval = interval
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        if self.run_first:
+            self._call()
+        while not self._stop.wait(self.interval):
+            self._call()
+
+    def _call(self):
+        try:
+            self.target()
+        except Exception:
+            pass  # Try again next interval
+
+
+def stop_all(timeout: float = 5.0):
+    for task in TASKS:
+        task.stop(timeout)
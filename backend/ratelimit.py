@@ -0,0 +1,165 @@
+"""
+Per-client rate limiting
+
+RateLimitMiddleware gives every client IP a token bucket per endpoint
+class (search, detail, stats, login). Buckets live in an LRU-bounded table,
+so a flood of distinct addresses costs at most RATE_LIMIT_MAX_CLIENTS
+entries. A request that finds its bucket empty gets a 429 with Retry-After
+before it reaches a route, and with it the database and the visit writer.
+
+Limits are "<tokens per second>:<burst>", e.g. RATE_LIMIT_SEARCH=2:20.
+
+Behind a reverse proxy every request comes from the proxy's address, so
+list it in RATE_LIMIT_TRUSTED_PROXIES (addresses or CIDRs, comma
+separated, or "*" for any peer) and the client is read from
+X-Forwarded-For instead: the right-most address not itself a trusted proxy.
+"""
+import ipaddress
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+
+def parse_proxies(value: str):
+    """"10.0.0.0/8, 127.0.0.1" -> networks; "*" -> None, meaning every peer"""
+    if value.strip() == "*":
+        return None
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+RATE_LIMIT_TRUSTED_PROXIES = parse_proxies(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", ""))
+
+
+def _limit(name: str, default: str):
+    rate, burst = os.getenv(name, default).split(":")
+    return float(rate), float(burst)
+
+
+LIMITS = {
+    "search": _limit("RATE_LIMIT_SEARCH", "2:20"),
+    "detail": _limit("RATE_LIMIT_DETAIL", "5:30"),
+    "stats": _limit("RATE_LIMIT_STATS", "1:10"),
+    "login": _limit("RATE_LIMIT_LOGIN", "0.1:5"),
+}
+
+_DETAIL_PATH = re.compile(r"^/api/jobs/\d+$")
+
+
+def classify(method: str, path: str):
+    """Limit class of a request, or None for unlimited endpoints"""
+    if path == "/api/search":
+        return "search"
+    if path == "/api/admin/login":
+        return "login"
+    if path == "/api/stats" or path.startswith("/api/stats/"):
+        return "stats"
+    if method == "GET" and _DETAIL_PATH.match(path):
+        return "detail"
+    return None
+
+
+def _is_trusted(address: str, proxies) -> bool:
+    if proxies is None:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+def client_address(scope, proxies=RATE_LIMIT_TRUSTED_PROXIES) -> str:
+    """The client's IP, taken from X-Forwarded-For when the peer is a trusted proxy"""
+    peer = scope["client"][0] if scope.get("client") else "unknown"
+    if not _is_trusted(peer, proxies):
+        return peer
+    forwarded = []
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            forwarded += [item.strip() for item in value.decode("latin-1").split(",") if item.strip()]
+    if proxies is None:
+        # Only the peer is trusted, so only the address it appended counts
+        return forwarded[-1] if forwarded else peer
+    for address in reversed(forwarded):
+        if not _is_trusted(address, proxies):
+            return address
+    return forwarded[0] if forwarded else peer
+
+
+class TokenBuckets:
+    """LRU-bounded table of (client, class) -> [tokens, last refill time]"""
+
+    def __init__(self, limits: dict = LIMITS, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.limits = limits
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, client: str, limit_class: str, now: float = None) -> float:
+        """Spend one token; returns 0 when allowed, else seconds until a token is available"""
+        rate, burst = self.limits[limit_class]
+        now = time.monotonic() if now is None else now
+        key = (client, limit_class)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [burst, now]
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate if rate > 0 else 60.0
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware answering 429 once a client's bucket is empty"""
+
+    def __init__(self, app, buckets: TokenBuckets = None, enabled: bool = RATE_LIMIT_ENABLED,
+                 trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES):
+        self.app = app
+        self.buckets = buckets or TokenBuckets()
+        self.enabled = enabled
+        self.trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        limit_class = classify(scope["method"], scope["path"])
+        if limit_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        client = client_address(scope, self.trusted_proxies)
+        wait = self.buckets.take(client, limit_class)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        metrics.registry.inc("rate_limited_requests_total", endpoint=limit_class)
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
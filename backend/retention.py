@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Retention for raw visit rows
+
+Visits older than the retention window are compacted into exact per-day,
+per-job visit_daily rows, then deleted from user_visits in small batches,
+each in its own short transaction so the visit writer and admin writes
+never wait long for the lock. Days before the compaction mark (kept in
+stat_counters) are served from visit_daily alone. Run it from cron:
+
+    python retention.py --days 90 --dry-run
+    python retention.py --days 90
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+
+from sqlalchemy import func
+
+import models
+import stats
+from database import SessionLocal, pin_to_writer
+
+VISIT_RETENTION_DAYS = int(os.getenv("VISIT_RETENTION_DAYS", "90"))
+DELETE_BATCH_SIZE = int(os.getenv("VISIT_DELETE_BATCH_SIZE", "1000"))
+DELETE_BATCH_PAUSE = float(os.getenv("VISIT_DELETE_BATCH_PAUSE", "0.05"))
+
+# Approximate on-disk cost of a visit row besides its strings
+# (record header, id, visited_at, job_id, rowid and index entries)
+ROW_OVERHEAD_BYTES = 48
+
+
+def cutoff_for(days: int, today: datetime.date = None) -> datetime.date:
+    """First day whose raw visits are kept"""
+    return (today or datetime.datetime.utcnow().date()) - datetime.timedelta(days=days)
+
+
+def _expired(db, cutoff: datetime.date):
+    start = datetime.datetime.combine(cutoff, datetime.time())
+    return db.query(models.UserVisit).filter(models.UserVisit.visited_at < start)
+
+
+def report(db, cutoff: datetime.date) -> dict:
+    """What compacting everything before `cutoff` would do"""
+    visits = models.UserVisit
+    rows, text_bytes, first = _expired(db, cutoff).with_entities(
+        func.count(visits.id),
+        func.coalesce(func.sum(
+            func.coalesce(func.length(visits.ip_address), 0)
+            + func.coalesce(func.length(visits.user_agent), 0)
+        ), 0),
+        func.min(visits.visited_at),
+    ).one()
+    marker = stats.compacted_before(db)
+    return {
+        "cutoff": cutoff.isoformat(),
+        "compacted_before": marker.isoformat() if marker else None,
+        "rows": rows,
+        "days": (cutoff - first.date()).days if first else 0,
+        "estimated_bytes": int(text_bytes) + rows * ROW_OVERHEAD_BYTES,
+    }
+
+
+def compact_days(db, cutoff: datetime.date):
+    """Rewrite visit_daily exactly from the raw rows before `cutoff` and move the mark"""
+    pin_to_writer(db)
+    marker = stats.compacted_before(db)
+    day = func.date(models.UserVisit.visited_at)
+    job_id = func.coalesce(models.UserVisit.job_id, 0)
+    expired = _expired(db, cutoff)
+    if marker:
+        # Days before the mark are final; leftovers there are only awaiting deletion
+        expired = expired.filter(models.UserVisit.visited_at >= datetime.datetime.combine(marker, datetime.time()))
+    daily = expired.filter(models.UserVisit.weight > 0).with_entities(
+        day, job_id, func.sum(models.UserVisit.weight)
+    ).group_by(day, job_id)
+
+    rows = []
+    for visit_day, visit_job_id, visits in daily:
+        if isinstance(visit_day, str):
+            visit_day = datetime.date.fromisoformat(visit_day)
+        rows.append(models.VisitDaily(day=visit_day, job_id=visit_job_id, visits=visits))
+    if rows:
+        db.query(models.VisitDaily).filter(
+            models.VisitDaily.day >= min(row.day for row in rows),
+            models.VisitDaily.day < cutoff,
+        ).delete(synchronize_session=False)
+        db.add_all(rows)
+
+    if marker is None or cutoff > marker:
+        stats.set_compacted_before(db, cutoff)
+    db.commit()
+
+
+def delete_expired(db, cutoff: datetime.date, batch_size: int = DELETE_BATCH_SIZE,
+                   pause: float = DELETE_BATCH_PAUSE) -> int:
+    """Delete raw visits before `cutoff`, one short transaction per batch"""
+    deleted = 0
+    while True:
+        ids = [row.id for row in _expired(db, cutoff).with_entities(models.UserVisit.id)
+               .order_by(models.UserVisit.id).limit(batch_size)]
+        if not ids:
+            return deleted
+        db.query(models.UserVisit).filter(models.UserVisit.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def run(days: int = VISIT_RETENTION_DAYS, dry_run: bool = False, session_factory=SessionLocal) -> dict:
+    """Compact and prune visits older than `days`; returns the report"""
+    cutoff = cutoff_for(days)
+    with session_factory() as db:
+        result = report(db, cutoff)
+        if dry_run:
+            return result
+        compact_days(db, cutoff)
+        result["deleted"] = delete_expired(db, cutoff)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and prune old user_visits rows")
+    parser.add_argument("--days", type=int, default=VISIT_RETENTION_DAYS,
+                        help=f"raw visits to keep, in days (default {VISIT_RETENTION_DAYS})")
+    parser.add_argument("--dry-run", action="store_true", help="report rows and bytes without changing anything")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.days, args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
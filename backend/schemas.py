@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import datetime
 
 class AdminLogin(BaseModel):
@@ -49,12 +49,59 @@ class JobResponse(BaseModel):
     link: str
     location: str
     last_date: str
+    closes_on: Optional[datetime.date] = None  # last_date as a date, when it parses
     created_at: datetime.datetime
     updated_at: datetime.datetime
     
     class Config:
         from_attributes = True
 
+class JobPage(BaseModel):
+    items: List[JobResponse]
+    next_cursor: Optional[str] = None
+
+class JobSummary(BaseModel):
+    id: int
+    job_name: str
+    company: str
+    location: str
+    eligible_years: str
+    last_date: str
+    link: str
+    created_at: datetime.datetime
+    summary: str  # first characters of job_description
+
+class JobTombstone(BaseModel):
+    id: int
+    deleted_at: datetime.datetime
+
+class JobChanges(BaseModel):
+    changes: List[JobResponse]
+    deleted: List[JobTombstone]
+    next_token: str  # pass back as ?since= for the next batch
+    has_more: bool
+
+class TrendingJob(JobSummary):
+    views: int  # views inside the requested window
+
+class JobSummaryPage(BaseModel):
+    items: List[JobSummary]
+    next_cursor: Optional[str] = None
+
+class ScoredJob(JobResponse):
+    score: float  # trigram similarity to the fuzzy query
+
+class ScoredJobPage(BaseModel):
+    items: List[ScoredJob]
+    next_cursor: Optional[str] = None
+
+class ScoredJobSummary(JobSummary):
+    score: float
+
+class ScoredJobSummaryPage(BaseModel):
+    items: List[ScoredJobSummary]
+    next_cursor: Optional[str] = None
+
 class UserVisitResponse(BaseModel):
     total_visits: int
     unique_visitors: int
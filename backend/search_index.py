@@ -0,0 +1,107 @@
+"""
+Full-text search index for jobs
+
+SQLite uses an external-content FTS5 table kept in sync by triggers on
+`jobs`; Postgres uses a GIN index over a tsvector expression. Both give
+ranked, prefix-matching search without scanning the jobs table.
+"""
+import re
+
+from sqlalchemy import column, desc, func, literal_column, table, text
+
+import models
+
+FTS_TABLE = "jobs_fts"
+
+# Column weights for bm25(): a title hit outranks a company hit, which
+# outranks a description hit
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(jobs.job_name, '') || ' ' || "
+    "coalesce(jobs.company, '') || ' ' || coalesce(jobs.job_description, ''))"
+)
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        job_name, company, job_description,
+        content='jobs', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, job_name, company, job_description)
+        VALUES (new.id, new.job_name, new.company, new.job_description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, job_name, company, job_description)
+        VALUES ('delete', old.id, old.job_name, old.company, old.job_description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_au
+        AFTER UPDATE OF job_name, company, job_description ON jobs BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, job_name, company, job_description)
+        VALUES ('delete', old.id, old.job_name, old.company, old.job_description);
+        INSERT INTO {FTS_TABLE}(rowid, job_name, company, job_description)
+        VALUES (new.id, new.job_name, new.company, new.job_description);
+    END""",
+]
+
+PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_jobs_search ON jobs USING GIN ({PG_DOCUMENT})",
+]
+
+jobs_fts = table(FTS_TABLE, column("rowid"))
+
+
+def ensure_search_index(engine):
+    """Create the text index for the current dialect and backfill it if new"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+            ).first()
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for statement in PG_DDL:
+                conn.execute(text(statement))
+
+
+def search_terms(q: str) -> list:
+    """Split a raw query into lowercase word tokens"""
+    return re.findall(r"\w+", q.lower())
+
+
+def apply_text_search(query, q: str, dialect: str, ranked: bool = True):
+    """Filter (and optionally rank) a Job query by a free-text search string"""
+    terms = search_terms(q)
+    if not terms:
+        return query
+
+    if dialect == "sqlite":
+        # Every term must match, each as a prefix so partially typed words hit
+        match = " ".join(f'"{term}"*' for term in terms)
+        rank = literal_column(f"bm25({FTS_TABLE}, {', '.join(map(str, FTS_WEIGHTS))})")
+        query = query.join(jobs_fts, jobs_fts.c.rowid == models.Job.id).filter(
+            text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=match)
+        )
+        return query.order_by(rank) if ranked else query
+
+    if dialect == "postgresql":
+        document = literal_column(PG_DOCUMENT)
+        ts_query = func.to_tsquery(
+            literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms)
+        )
+        query = query.filter(document.op("@@")(ts_query))
+        return query.order_by(desc(func.ts_rank(document, ts_query))) if ranked else query
+
+    # Other backends: plain substring match
+    for term in terms:
+        search_term = f"%{term}%"
+        query = query.filter(
+            (models.Job.job_name.ilike(search_term)) |
+            (models.Job.company.ilike(search_term)) |
+            (models.Job.job_description.ilike(search_term))
+        )
+    return query
@@ -0,0 +1,86 @@
+"""
+Serving the built frontend
+
+PrecompressedStatic loads frontend/dist (see frontend/build.py) into memory
+once and answers with the stored bytes, or their .gz twin when the client
+accepts gzip. Hashed assets are cached as immutable; index.html gets a
+short max-age plus an ETag so a reload costs a 304.
+"""
+import hashlib
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+
+FRONTEND_DIST_DIR = os.getenv(
+    "FRONTEND_DIST_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "dist")
+)
+INDEX_MAX_AGE = int(os.getenv("FRONTEND_INDEX_MAX_AGE", "60"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+INDEX = "index.html"
+
+
+class PrecompressedStatic:
+    """ASGI app serving a built frontend directory from memory"""
+
+    def __init__(self, directory: str = FRONTEND_DIST_DIR):
+        self.files = {}  # name -> (headers, body, gzipped body or None)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".gz") or name == "manifest.json" or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            gzipped = None
+            if os.path.exists(path + ".gz"):
+                with open(path + ".gz", "rb") as f:
+                    gzipped = f.read()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type.endswith("javascript"):
+                media_type += "; charset=utf-8"
+            self.files[name] = (
+                {
+                    "content-type": media_type,
+                    "cache-control": f"public, max-age={INDEX_MAX_AGE}" if name == INDEX else IMMUTABLE,
+                    "etag": f'"{hashlib.sha1(body).hexdigest()[:16]}"',
+                    "vary": "Accept-Encoding",
+                },
+                body,
+                gzipped,
+            )
+
+    async def __call__(self, scope, receive, send):
+        name = scope["path"].lstrip("/") or INDEX
+        entry = self.files.get(name)
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send(send, 405, {"allow": "GET, HEAD"}, b"")
+            return
+        if entry is None:
+            await self._send(send, 404, {"content-type": "text/plain"}, b"Not Found")
+            return
+
+        headers, body, gzipped = entry
+        request_headers = Headers(scope=scope)
+        if request_headers.get("if-none-match") == headers["etag"]:
+            await self._send(send, 304, headers, b"")
+            return
+
+        headers = dict(headers)
+        if gzipped is not None and "gzip" in request_headers.get("accept-encoding", ""):
+            body = gzipped
+            headers["content-encoding"] = "gzip"
+        headers["content-length"] = str(len(body))
+        await self._send(send, 200, headers, b"" if scope["method"] == "HEAD" else body)
+
+    @staticmethod
+    async def _send(send, status: int, headers: dict, body: bytes):
+        if status != 304:
+            headers = {"content-length": str(len(body)), **headers}
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": body})
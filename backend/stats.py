@@ -0,0 +1,217 @@
+"""
+Visit statistics rollups
+
+The visit writer folds every batch into running counters, per-day/per-job
+rollups and a HyperLogLog sketch of visitor IPs, so /api/stats never has to
+scan user_visits. recompute_stats() rebuilds everything exactly from the
+raw table, plus visit_daily for days whose raw rows retention has pruned.
+"""
+import datetime
+import hashlib
+import math
+
+from sqlalchemy import func, update
+
+import models
+from database import pin_to_writer
+
+TOTAL_VISITS = "total_visits"
+# Kept by facets.py in the same transactions as facet_counts
+ACTIVE_JOBS = "active_jobs"
+ALL_VISITORS = "all"
+
+# Day ordinal before which user_visits has been compacted into visit_daily (see retention.py)
+COMPACTED_BEFORE = "visits_compacted_before"
+
+HLL_PRECISION = 12  # 4096 one-byte registers, ~1.6% standard error
+
+
+def job_views_key(job_id: int) -> str:
+    return f"job_views:{job_id}"
+
+
+class HyperLogLog:
+    """Fixed-size unique-count estimator over hashed strings"""
+
+    def __init__(self, registers: bytes = None, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting is exact-ish here
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def add_counter(db, key: str, amount: int):
+    result = db.execute(
+        update(models.StatCounter)
+        .where(models.StatCounter.key == key)
+        .values(value=models.StatCounter.value + amount)
+    )
+    if result.rowcount == 0:
+        db.add(models.StatCounter(key=key, value=amount))
+        db.flush()
+
+
+def _add_daily(db, day, job_id: int, amount: int):
+    result = db.execute(
+        update(models.VisitDaily)
+        .where(models.VisitDaily.day == day, models.VisitDaily.job_id == job_id)
+        .values(visits=models.VisitDaily.visits + amount)
+    )
+    if result.rowcount == 0:
+        db.add(models.VisitDaily(day=day, job_id=job_id, visits=amount))
+        db.flush()
+
+
+def record_visits(db, rows: list):
+    """Fold a batch of visit rows into the rollups (caller commits)"""
+    pin_to_writer(db)
+    # Sampled rows stand for `weight` visits; tagged bots (weight 0) count for
+    # none, and sampled-out visits (weight None) only feed the visitor sketch
+    humans = [row for row in rows if row.get("weight", 1) != 0]
+    if not humans:
+        return
+    counted = [row for row in humans if row.get("weight", 1) is not None]
+    if counted:
+        add_counter(db, TOTAL_VISITS, sum(row.get("weight", 1) for row in counted))
+
+    daily = {}
+    job_views = {}
+    for row in counted:
+        weight = row.get("weight", 1)
+        job_id = row.get("job_id") or 0
+        key = (row["visited_at"].date(), job_id)
+        daily[key] = daily.get(key, 0) + weight
+        if row.get("job_id"):
+            job_views[job_id] = job_views.get(job_id, 0) + weight
+    for (day, job_id), amount in daily.items():
+        _add_daily(db, day, job_id, amount)
+    for job_id, amount in job_views.items():
+        add_counter(db, job_views_key(job_id), amount)
+
+    # Pinned, this read happens inside the writer's BEGIN IMMEDIATE
+    # transaction, so the read-merge-write can't race another worker;
+    # FOR UPDATE does the same on databases that support it
+    sketch_row = db.query(models.VisitorSketch).filter(
+        models.VisitorSketch.name == ALL_VISITORS
+    ).with_for_update().first()
+    sketch = HyperLogLog(sketch_row.registers if sketch_row else None)
+    for row in humans:
+        sketch.add(row["ip_address"] or "unknown")
+    if sketch_row:
+        sketch_row.registers = bytes(sketch.registers)
+    else:
+        db.add(models.VisitorSketch(name=ALL_VISITORS, registers=bytes(sketch.registers)))
+
+
+def get_counter(db, key: str) -> int:
+    row = db.get(models.StatCounter, key)
+    return row.value if row else 0
+
+
+def unique_visitors(db) -> int:
+    row = db.get(models.VisitorSketch, ALL_VISITORS)
+    return HyperLogLog(row.registers).count() if row else 0
+
+
+def compacted_before(db):
+    """Date before which only visit_daily holds visits, or None"""
+    value = get_counter(db, COMPACTED_BEFORE)
+    return datetime.date.fromordinal(value) if value else None
+
+
+def set_compacted_before(db, day: datetime.date):
+    row = db.get(models.StatCounter, COMPACTED_BEFORE)
+    if row:
+        row.value = day.toordinal()
+    else:
+        db.add(models.StatCounter(key=COMPACTED_BEFORE, value=day.toordinal()))
+
+
+def recompute_stats(db) -> dict:
+    """Rebuild counters, rollups and the sketch exactly from user_visits
+
+    Compacted days keep their visit_daily rows, and the sketch is extended
+    rather than replaced, since the raw rows behind them are gone. The same
+    goes for sampled visits: the IPs of the ones left out are only in the sketch.
+    """
+    pin_to_writer(db)
+    cutoff = compacted_before(db)
+    visits = db.query(models.UserVisit).filter(models.UserVisit.weight > 0)
+    sampled = db.query(visits.filter(models.UserVisit.weight > 1).exists()).scalar()
+    daily_rows = db.query(models.VisitDaily)
+    if cutoff:
+        visits = visits.filter(models.UserVisit.visited_at >= datetime.datetime.combine(cutoff, datetime.time()))
+        daily_rows = daily_rows.filter(models.VisitDaily.day >= cutoff)
+
+    db.query(models.StatCounter).filter(
+        (models.StatCounter.key == TOTAL_VISITS) | models.StatCounter.key.like(job_views_key("%"))
+    ).delete(synchronize_session=False)
+    daily_rows.delete(synchronize_session=False)
+    sketch_row = db.get(models.VisitorSketch, ALL_VISITORS)
+    sketch = HyperLogLog(sketch_row.registers if sketch_row and (cutoff or sampled) else None)
+    if sketch_row:
+        db.delete(sketch_row)
+        db.flush()
+
+    job_views = {}
+    total = 0
+    compacted = db.query(
+        models.VisitDaily.job_id, func.sum(models.VisitDaily.visits)
+    ).group_by(models.VisitDaily.job_id)
+    for job_id, visit_count in compacted:
+        total += visit_count
+        if job_id:
+            job_views[job_id] = visit_count
+
+    day = func.date(models.UserVisit.visited_at)
+    job_id_or_zero = func.coalesce(models.UserVisit.job_id, 0)
+    daily = visits.with_entities(day, job_id_or_zero, func.sum(models.UserVisit.weight)).group_by(day, job_id_or_zero)
+    for visit_day, job_id, visit_count in daily:
+        if isinstance(visit_day, str):
+            visit_day = datetime.date.fromisoformat(visit_day)
+        db.add(models.VisitDaily(day=visit_day, job_id=job_id, visits=visit_count))
+        total += visit_count
+        if job_id:
+            job_views[job_id] = job_views.get(job_id, 0) + visit_count
+    db.add(models.StatCounter(key=TOTAL_VISITS, value=total))
+    for job_id, views in job_views.items():
+        db.add(models.StatCounter(key=job_views_key(job_id), value=views))
+
+    exact_unique = 0
+    ips = visits.with_entities(models.UserVisit.ip_address).distinct().execution_options(yield_per=5000)
+    for (ip,) in ips:
+        sketch.add(ip or "unknown")
+        exact_unique += 1
+    db.add(models.VisitorSketch(name=ALL_VISITORS, registers=bytes(sketch.registers)))
+    db.commit()
+
+    return {
+        "total_visits": total,
+        # Visitors seen only on compacted days or in unstored visits survive in the sketch alone
+        "unique_visitors": sketch.count() if cutoff or sampled else exact_unique,
+        "jobs_with_views": len(job_views),
+    }
+
+
+def backfill_stats(db):
+    """Build the rollups from existing visits the first time they are needed"""
+    if db.get(models.StatCounter, TOTAL_VISITS) is None:
+        if db.query(models.UserVisit.id).first() is not None:
+            recompute_stats(db)
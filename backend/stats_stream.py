@@ -0,0 +1,103 @@
+"""
+Live stats over Server-Sent Events
+
+One StatsPublisher task per process reads the stats at most once per
+STATS_STREAM_INTERVAL while anyone is subscribed, and hands each
+subscriber only the values that changed. A slow subscriber's pending
+changes are merged rather than queued, so it always catches up with a
+single message. With no subscribers the task stops and nothing is read.
+"""
+import asyncio
+import json
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+import stats
+from database import SessionLocal
+
+STATS_STREAM_INTERVAL = float(os.getenv("STATS_STREAM_INTERVAL", "1.0"))
+STATS_STREAM_KEEPALIVE = float(os.getenv("STATS_STREAM_KEEPALIVE", "15"))
+
+
+def read_stats(session_factory=SessionLocal) -> dict:
+    """The /api/stats numbers"""
+    with session_factory() as db:
+        return {
+            "total_visits": stats.get_counter(db, stats.TOTAL_VISITS),
+            "unique_visitors": stats.unique_visitors(db),
+            "total_jobs": stats.get_counter(db, stats.ACTIVE_JOBS),
+        }
+
+
+class Subscriber:
+    def __init__(self):
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, changes: dict):
+        self.pending.update(changes)
+        self.ready.set()
+
+    def take(self) -> dict:
+        changes, self.pending = self.pending, {}
+        self.ready.clear()
+        return changes
+
+
+class StatsPublisher:
+    def __init__(self, interval: float = STATS_STREAM_INTERVAL, reader=read_stats):
+        self.interval = interval
+        self.reader = reader
+        self.subscribers = set()
+        self.snapshot = None
+        self._task = None
+
+    async def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        if self.snapshot is None:
+            self.snapshot = await run_in_threadpool(self.reader)
+        subscriber.push(self.snapshot)
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _run(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            if not self.subscribers:
+                break
+            try:
+                current = await run_in_threadpool(self.reader)
+            except Exception:
+                continue  # Keep the stream alive through a transient database error
+            changes = {key: value for key, value in current.items() if self.snapshot.get(key) != value}
+            self.snapshot = current
+            if changes:
+                for subscriber in list(self.subscribers):
+                    subscriber.push(changes)
+        # A fresh snapshot is read for the next first subscriber
+        self.snapshot = None
+
+    async def events(self):
+        """SSE body for one client: a snapshot event, then delta events as values change"""
+        subscriber = await self.subscribe()
+        try:
+            event = "snapshot"
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), STATS_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(subscriber.take())}\n\n"
+                event = "delta"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+stats_publisher = StatsPublisher()
@@ -0,0 +1,105 @@
+"""
+Typeahead suggestions from an in-memory prefix index
+
+Every distinct job title, company and location of the active catalog is
+stored under each of its word starts ("python developer", "developer") in
+one sorted array. A prefix lookup is a bisect plus a short forward scan, and
+results are memoized per prefix until the catalog changes, so /api/suggest
+never touches the database on the request path.
+"""
+import bisect
+import json
+import os
+import re
+
+import models
+from catalog_index import CatalogIndex
+
+SUGGEST_MAX_RESULTS = 20
+SUGGEST_SCAN_LIMIT = int(os.getenv("SUGGEST_SCAN_LIMIT", "500"))
+SUGGEST_MEMO_SIZE = int(os.getenv("SUGGEST_MEMO_SIZE", "4096"))
+
+KINDS = (("title", "job_name"), ("company", "company"), ("location", "location"))
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _word_starts(key: str) -> list:
+    return [key[match.start():] for match in re.finditer(r"\b\w", key)]
+
+
+class SuggestIndex(CatalogIndex):
+    columns = (models.Job.id, models.Job.job_name, models.Job.company, models.Job.location)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._clear()
+
+    def _clear(self):
+        self.keys = []     # sorted (normalized word start, kind, value)
+        self.counts = {}   # (kind, value) -> active jobs
+        self.memo = {}     # (prefix, limit) -> (generation, body)
+
+    def _terms(self, job):
+        for kind, attribute in KINDS:
+            value = (getattr(job, attribute) or "").strip()
+            if value and normalize(value):
+                yield kind, value
+
+    def _add(self, job):
+        for kind, value in self._terms(job):
+            count = self.counts.get((kind, value), 0)
+            self.counts[(kind, value)] = count + 1
+            if count == 0:
+                for start in _word_starts(normalize(value)):
+                    bisect.insort(self.keys, (start, kind, value))
+
+    def _remove(self, job):
+        for kind, value in self._terms(job):
+            count = self.counts.get((kind, value), 0) - 1
+            if count > 0:
+                self.counts[(kind, value)] = count
+                continue
+            self.counts.pop((kind, value), None)
+            for start in _word_starts(normalize(value)):
+                entry = (start, kind, value)
+                position = bisect.bisect_left(self.keys, entry)
+                if position < len(self.keys) and self.keys[position] == entry:
+                    del self.keys[position]
+
+    def lookup(self, prefix: str, limit: int) -> list:
+        """Up to `limit` (kind, value, count) matches for a prefix, most jobs first"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = set()
+        position = bisect.bisect_left(self.keys, (prefix,))
+        for key, kind, value in self.keys[position:position + SUGGEST_SCAN_LIMIT]:
+            if not key.startswith(prefix):
+                break
+            found.add((kind, value))
+        ranked = sorted(found, key=lambda term: (-self.counts[term], term[1].lower(), term[0]))
+        return [(kind, value, self.counts[(kind, value)]) for kind, value in ranked[:limit]]
+
+    def suggest_body(self, prefix: str, limit: int) -> bytes:
+        """JSON suggestions for a prefix, memoized until the catalog changes"""
+        self.refresh()
+        key = (prefix, limit)
+        cached = self.memo.get(key)
+        if cached and cached[0] == self.generation:
+            return cached[1]
+        with self.lock:
+            generation = self.generation
+            matches = self.lookup(prefix, limit)
+        body = json.dumps([
+            {"value": value, "type": kind, "count": count} for kind, value, count in matches
+        ]).encode()
+        if len(self.memo) >= SUGGEST_MEMO_SIZE:
+            self.memo.clear()
+        self.memo[key] = (generation, body)
+        return body
+
+
+suggest_index = SuggestIndex()
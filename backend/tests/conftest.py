@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+# Modules read DATABASE_URL at import; keep them away from the real database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import models  # noqa: E402
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions on a fresh SQLite database with every table created"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False}
+    )
+    models.Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
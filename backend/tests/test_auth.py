@@ -0,0 +1,41 @@
+import pytest
+
+import auth
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """A worker with its own in-memory token state and a fixed signing key"""
+    monkeypatch.setattr(auth, "_token_secret", "test-secret")
+    monkeypatch.setattr(auth, "_revocation_version", None)
+    monkeypatch.setattr(auth, "REVOKED_TOKENS", {})
+    monkeypatch.setattr(auth, "VERIFIED_TOKENS", auth.OrderedDict())
+    return auth
+
+
+def test_logout_reaches_other_workers_on_refresh(worker, session_factory):
+    token = worker.create_access_token(1)
+    assert worker.verify_token(token) == 1
+    worker.logout_token(token, session_factory=session_factory)
+
+    # Another worker: only its verified-token cache knows the token
+    worker.REVOKED_TOKENS.clear()
+    worker._revocation_version = None
+    worker.VERIFIED_TOKENS[token] = worker._decode_token(token)
+    assert worker.verify_token(token) == 1
+    worker.refresh_revoked_tokens(session_factory)
+    assert worker.verify_token(token) is None
+
+
+def test_verify_keeps_last_known_revocations_when_the_database_fails(worker, session_factory):
+    revoked, kept = worker.create_access_token(1), worker.create_access_token(1)
+    worker.logout_token(revoked, session_factory=session_factory)
+    worker.refresh_revoked_tokens(session_factory)
+
+    def unreachable():
+        raise RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        worker.refresh_revoked_tokens(unreachable)
+    assert worker.verify_token(revoked) is None
+    assert worker.verify_token(kept) == 1
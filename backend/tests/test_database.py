@@ -0,0 +1,36 @@
+from sqlalchemy import event
+
+import database
+import models
+
+
+def _statements(engine, log, name):
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.append((name, statement.split()[0]))
+    event.listen(engine, "before_cursor_execute", record)
+    return record
+
+
+def test_pinned_sessions_read_inside_the_write_transaction():
+    models.Base.metadata.create_all(bind=database.engine)
+    log = []
+    writer = _statements(database.engine, log, "writer")
+    reader = _statements(database.read_engine, log, "reader")
+    try:
+        with database.SessionLocal() as db:
+            database.pin_to_writer(db)
+            db.query(models.StatCounter).first()
+        with database.WriterSessionLocal() as db:
+            db.query(models.StatCounter).first()
+        with database.SessionLocal() as db:
+            db.query(models.StatCounter).first()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", writer)
+        event.remove(database.read_engine, "before_cursor_execute", reader)
+
+    assert database.use_sqlite_profile
+    assert log == [
+        ("writer", "BEGIN"), ("writer", "SELECT"),
+        ("writer", "BEGIN"), ("writer", "SELECT"),
+        ("reader", "SELECT"),
+    ]
@@ -0,0 +1,34 @@
+import asyncio
+import datetime
+
+import export
+import models
+
+
+def test_abandoned_export_closes_its_session(session_factory):
+    now = datetime.datetime.utcnow()
+    with session_factory() as db:
+        db.add_all(models.UserVisit(ip_address=f"10.0.0.{i}", visited_at=now) for i in range(50))
+        db.commit()
+    closed = []
+
+    def tracked_sessions():
+        db = session_factory()
+        db.close = lambda: closed.append(True)
+        return db
+
+    export.EXPORT_BATCH_SIZE, batch_size = 10, export.EXPORT_BATCH_SIZE
+    try:
+        chunks = export.iter_encoded("user_visits", session_factory=tracked_sessions)
+
+        async def read_one_chunk():
+            stream = export.close_on_disconnect(chunks)
+            assert await stream.__anext__()
+            await stream.aclose()  # What Starlette's cancellation does to the body iterator
+
+        asyncio.run(read_one_chunk())
+    finally:
+        export.EXPORT_BATCH_SIZE = batch_size
+
+    assert chunks.gi_frame is None
+    assert closed == [True]
@@ -0,0 +1,34 @@
+import facets
+import models
+import stats
+
+
+def _job(**values):
+    defaults = {"job_name": "Python Developer", "company": "Zoho", "job_description": "python",
+                "eligible_years": "0-2", "qualification": "B.Tech", "link": "https://example.com",
+                "location": "Pune", "last_date": "2030-12-31", "admin_id": 1, "is_active": True}
+    return models.Job(**{**defaults, **values})
+
+
+def test_active_jobs_counter_follows_job_writes(session_factory):
+    with session_factory() as db:
+        jobs = [_job(), _job(location=None, eligible_years=""), _job(location="Delhi")]
+        db.add_all(jobs)
+        db.flush()
+        facets.sync_many_job_facets(db, [(job, frozenset()) for job in jobs])
+        db.commit()
+        assert stats.get_counter(db, stats.ACTIVE_JOBS) == 3
+
+        # A job with no facets of its own still counts once it is deactivated
+        before = facets.job_facets(jobs[1])
+        jobs[1].is_active = False
+        facets.sync_job_facets(db, jobs[1], before)
+        before = facets.job_facets(jobs[0])
+        jobs[0].location = "Delhi"
+        facets.sync_job_facets(db, jobs[0], before)
+        db.commit()
+        assert stats.get_counter(db, stats.ACTIVE_JOBS) == 2
+        assert facets.facet_values(db, facets.LOCATION) == [{"value": "Delhi", "count": 2}]
+
+        facets.rebuild_facets(db)
+        assert stats.get_counter(db, stats.ACTIVE_JOBS) == 2
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND
+
+# Every worker pays this on boot: it must not touch the database or derive keys
+IMPORT_MAIN = """
+import hashlib
+import json
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+pbkdf2_calls = []
+pbkdf2_hmac = hashlib.pbkdf2_hmac
+statements = []
+connections = []
+
+
+def counted_pbkdf2_hmac(*args, **kwargs):
+    pbkdf2_calls.append(args[0])
+    return pbkdf2_hmac(*args, **kwargs)
+
+
+hashlib.pbkdf2_hmac = counted_pbkdf2_hmac
+event.listen(Engine, "before_cursor_execute",
+             lambda conn, cursor, statement, *rest: statements.append(statement))
+event.listen(Pool, "connect", lambda dbapi_connection, record: connections.append(True))
+
+import main
+
+print(json.dumps({"statements": statements, "connections": len(connections),
+                  "pbkdf2": len(pbkdf2_calls)}))
+"""
+
+
+def test_importing_main_runs_no_sql_and_no_key_derivation(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'import.db'}")
+    output = subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+
+    assert result == {"statements": [], "connections": 0, "pbkdf2": 0}
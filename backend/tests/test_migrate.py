@@ -0,0 +1,28 @@
+import datetime
+
+import database
+import migrate
+import models
+import stats
+
+
+def test_interning_user_agents_drops_past_bots_from_the_rollups():
+    models.Base.metadata.create_all(bind=database.engine)
+    now = datetime.datetime.utcnow()
+    with database.SessionLocal() as db:
+        db.add_all([
+            models.UserVisit(ip_address="10.0.0.1", user_agent="Mozilla/5.0", visited_at=now, job_id=1),
+            models.UserVisit(ip_address="10.0.0.2", user_agent="Googlebot/2.1", visited_at=now, job_id=1),
+            models.UserVisit(ip_address="10.0.0.3", user_agent="curl/8.0", visited_at=now),
+        ])
+        db.commit()
+        # Rollups as they were built before bots were told apart
+        assert stats.recompute_stats(db)["total_visits"] == 3
+
+    migrate._intern_user_agents(database.engine)
+
+    with database.SessionLocal() as db:
+        assert db.query(models.UserVisit).filter(models.UserVisit.weight == 0).count() == 2
+        assert stats.get_counter(db, stats.TOTAL_VISITS) == 1
+        assert stats.get_counter(db, stats.job_views_key(1)) == 1
+        assert stats.unique_visitors(db) == 1
@@ -0,0 +1,26 @@
+import threading
+import time
+
+from periodic import PeriodicTask
+
+
+def test_periodic_task_survives_errors_and_stops():
+    calls = []
+    ran_twice = threading.Event()
+
+    def flaky():
+        calls.append(True)
+        if len(calls) >= 2:
+            ran_twice.set()
+        raise RuntimeError("database is down")
+
+    task = PeriodicTask("test-task", flaky, 0.01, run_first=True)
+    task.start()
+    task.start()  # Already running: no second thread
+    assert ran_twice.wait(5)
+    task.stop()
+
+    assert not task._thread.is_alive()
+    stopped_at = len(calls)
+    time.sleep(0.05)
+    assert len(calls) == stopped_at
@@ -0,0 +1,30 @@
+import datetime
+
+import models
+import stats
+from visits import VisitWriter
+
+
+def _rows(*user_agents):
+    now = datetime.datetime.utcnow()
+    return [
+        {"ip_address": "10.0.0.1", "user_agent": agent, "job_id": None,
+         "visited_at": now, "weight": 1}
+        for agent in user_agents
+    ]
+
+
+def test_user_agent_cache_limit_keeps_batches_writable(session_factory):
+    writer = VisitWriter(session_factory=session_factory, cache_size=3)
+    writer._write(_rows("Mozilla/5.0 A", "Mozilla/5.0 B"))
+    # Two cached plus two new goes over the limit of three
+    writer._write(_rows("Mozilla/5.0 A", "Mozilla/5.0 C", "Mozilla/5.0 D"))
+
+    assert writer.failed == 0
+    assert writer.written == 5
+    assert set(writer.user_agent_ids) == {"Mozilla/5.0 A", "Mozilla/5.0 C", "Mozilla/5.0 D"}
+    with session_factory() as db:
+        assert db.query(models.UserAgent).count() == 4
+        unlinked = db.query(models.UserVisit).filter(models.UserVisit.user_agent_id.is_(None))
+        assert unlinked.count() == 0
+        assert stats.get_counter(db, stats.TOTAL_VISITS) == 5
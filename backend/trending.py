@@ -0,0 +1,203 @@
+"""
+Trending jobs from in-memory sliding-window view counters
+
+Job views are counted per minute in a 24-hour ring of buckets, with running
+totals for each window kept up to date as minutes expire, so a view costs
+one dict increment. The top K of each window is recomputed at most every
+TRENDING_REFRESH seconds, and /api/jobs/trending serves a pre-serialized
+body built from it. The counters are fed from user_visits, not from the
+requests one process happens to serve: rebuilt from the last 24 hours on
+startup, then caught up every TRENDING_RELOAD seconds with the (weighted)
+rows written since, by any worker. So every worker ranks the same views,
+at most TRENDING_RELOAD plus the visit writer's flush interval behind.
+"""
+import datetime
+import heapq
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import func
+
+import models
+from database import SessionLocal
+from pagination import SUMMARY_COLUMNS
+from periodic import PeriodicTask
+
+WINDOWS = {"1h": 60, "24h": 24 * 60}  # name -> minutes
+RING_MINUTES = max(WINDOWS.values())
+
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "50"))
+TRENDING_REFRESH = float(os.getenv("TRENDING_REFRESH", "10"))
+TRENDING_RELOAD = float(os.getenv("TRENDING_RELOAD", "60"))
+
+
+def _minute(moment: datetime.datetime) -> int:
+    return int(moment.replace(tzinfo=datetime.timezone.utc).timestamp() // 60)
+
+
+class TrendingCounter:
+    """Per-minute job view buckets with running per-window totals"""
+
+    def __init__(self, top_k: int = TRENDING_TOP_K, refresh: float = TRENDING_REFRESH):
+        self.top_k = top_k
+        self.refresh = refresh
+        self.lock = threading.RLock()
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        self.buckets = [(None, {}) for _ in range(RING_MINUTES)]  # (minute, job_id -> views)
+        self.totals = {name: {} for name in WINDOWS}
+        self.current = None
+        self.last_visit_id = 0  # user_visits rows up to this id are counted
+        self.top = {name: [] for name in WINDOWS}
+        self._computed_at = 0.0
+        self._dirty = True
+
+    def _subtract(self, window: str, minute: int):
+        stamp, counts = self.buckets[minute % RING_MINUTES]
+        if stamp != minute:
+            return
+        totals = self.totals[window]
+        for job_id, views in counts.items():
+            remaining = totals.get(job_id, 0) - views
+            if remaining > 0:
+                totals[job_id] = remaining
+            else:
+                totals.pop(job_id, None)
+
+    def _advance(self, minute: int):
+        """Expire everything that left a window between the last view and `minute`"""
+        if self.current is not None and minute <= self.current:
+            return
+        if self.current is None or minute - self.current >= RING_MINUTES:
+            self.buckets = [(None, {}) for _ in range(RING_MINUTES)]
+            self.totals = {name: {} for name in WINDOWS}
+        else:
+            for step in range(self.current + 1, minute + 1):
+                for name, span in WINDOWS.items():
+                    self._subtract(name, step - span)
+                self.buckets[step % RING_MINUTES] = (step, {})
+        self.current = minute
+        self._dirty = True
+
+    def _add(self, job_id: int, minute: int, views: int):
+        if minute > self.current or minute <= self.current - RING_MINUTES:
+            return
+        stamp, counts = self.buckets[minute % RING_MINUTES]
+        if stamp != minute:
+            counts = {}
+            self.buckets[minute % RING_MINUTES] = (minute, counts)
+        counts[job_id] = counts.get(job_id, 0) + views
+        for name, span in WINDOWS.items():
+            if minute > self.current - span:
+                totals = self.totals[name]
+                totals[job_id] = totals.get(job_id, 0) + views
+        self._dirty = True
+
+    def add_views(self, views, now: datetime.datetime = None):
+        """Count (job_id, visited_at, weight) rows, e.g. from the database"""
+        with self.lock:
+            self._advance(_minute(now or datetime.datetime.utcnow()))
+            for job_id, visited_at, weight in views:
+                self._add(job_id, _minute(visited_at), weight)
+
+    def load(self, views, now: datetime.datetime = None):
+        """Replace the counters with (job_id, visited_at, weight) rows"""
+        with self.lock:
+            self.reset()
+            self.add_views(views, now)
+
+    def ranking(self, window: str):
+        """(generation, [(job_id, views)] best first) for a window, recomputed when stale"""
+        now = time.monotonic()
+        with self.lock:
+            if now - self._computed_at >= self.refresh:
+                self._advance(_minute(datetime.datetime.utcnow()))
+                if self._dirty:
+                    for name, totals in self.totals.items():
+                        self.top[name] = heapq.nlargest(
+                            self.top_k, totals.items(), key=lambda item: (item[1], item[0])
+                        )
+                    self.generation += 1
+                    self._dirty = False
+                self._computed_at = now
+            return self.generation, self.top[window]
+
+
+trending_counter = TrendingCounter()
+
+# (window, limit) -> (generation, catalog version, serialized body)
+_bodies = {}
+
+
+def _views(db, after_id: int, upto_id: int):
+    """Job views of the last 24 hours among user_visits rows after_id < id <= upto_id"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(minutes=RING_MINUTES)
+    visit = models.UserVisit
+    return db.query(visit.job_id, visit.visited_at, visit.weight).filter(
+        visit.id > after_id,
+        visit.id <= upto_id,
+        visit.visited_at >= since,
+        visit.job_id.isnot(None),
+        visit.weight > 0,
+    ).execution_options(yield_per=5000)
+
+
+def rebuild(session_factory=SessionLocal, counter: TrendingCounter = trending_counter):
+    """Load the last 24 hours of job views from user_visits"""
+    with session_factory() as db:
+        upto_id = db.query(func.max(models.UserVisit.id)).scalar() or 0
+        counter.load(_views(db, 0, upto_id))
+        counter.last_visit_id = upto_id
+
+
+def catch_up(session_factory=SessionLocal, counter: TrendingCounter = trending_counter):
+    """Count the user_visits rows written, by any worker, since the last load"""
+    with session_factory() as db:
+        upto_id = db.query(func.max(models.UserVisit.id)).scalar() or 0
+        if upto_id > counter.last_visit_id:
+            counter.add_views(_views(db, counter.last_visit_id, upto_id))
+            counter.last_visit_id = upto_id
+
+
+trending_reloader = PeriodicTask("trending-reloader", catch_up, TRENDING_RELOAD)
+
+
+def start_trending_reloader(interval: float = TRENDING_RELOAD):
+    """Catch the counters up with user_visits every `interval` seconds in a daemon thread"""
+    trending_reloader.start(interval)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def trending_body(window: str, limit: int, version: int, session_factory=SessionLocal,
+                  counter: TrendingCounter = trending_counter) -> bytes:
+    """JSON list of the most viewed active jobs in `window`, with their view counts"""
+    generation, ranking = counter.ranking(window)
+    cached = _bodies.get((window, limit))
+    if cached and cached[0] == generation and cached[1] == version:
+        return cached[2]
+
+    items = []
+    if ranking:
+        views = dict(ranking)
+        with session_factory() as db:
+            rows = db.query(*SUMMARY_COLUMNS).filter(
+                models.Job.id.in_(list(views)), models.Job.is_active == True
+            )
+            jobs = {row.id: row._asdict() for row in rows}
+        for job_id, count in ranking:
+            if job_id in jobs:
+                item = {k: _json_value(v) for k, v in jobs[job_id].items()}
+                items.append({**item, "views": count})
+                if len(items) == limit:
+                    break
+
+    body = json.dumps(items).encode()
+    _bodies[(window, limit)] = (generation, version, body)
+    return body
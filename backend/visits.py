@@ -0,0 +1,238 @@
+"""
+Buffered visit tracking
+
+Requests only enqueue a visit row; a background thread bulk-inserts them
+in batches so the write never sits on a request's critical path.
+
+Known bots are dropped (or kept with weight 0 when VISIT_BOTS=tag), and
+each endpoint keeps only a VISIT_SAMPLE_RATES share of its visits. A kept
+visit's weight is 1/rate rounded up or down at random, so the weighted
+rollups still estimate the full traffic. Visits left out by sampling are
+still queued, without being stored, so the unique-visitor sketch sees
+every human IP. User agents are stored once in user_agents and
+referenced by id.
+"""
+import datetime
+import functools
+import os
+import queue
+import random
+import re
+import threading
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+import models
+import stats
+from database import WriterSessionLocal
+
+VISIT_BATCH_SIZE = int(os.getenv("VISIT_BATCH_SIZE", "200"))
+VISIT_FLUSH_INTERVAL = float(os.getenv("VISIT_FLUSH_INTERVAL", "2.0"))
+VISIT_QUEUE_SIZE = int(os.getenv("VISIT_QUEUE_SIZE", "10000"))
+VISIT_BOTS = os.getenv("VISIT_BOTS", "exclude")  # exclude | tag
+USER_AGENT_CACHE_SIZE = int(os.getenv("USER_AGENT_CACHE_SIZE", "10000"))
+
+# Crawlers, link previewers, uptime probes and HTTP libraries; a missing
+# user-agent header is recorded as "unknown" and counts as a bot too
+BOT_PATTERN = re.compile(os.getenv("VISIT_BOT_PATTERN", (
+    r"bot|crawl|spider|slurp|scrape|archiver|facebookexternalhit|embedly|preview"
+    r"|monitor|uptime|pingdom|statuscake|health|probe|headless|lighthouse"
+    r"|curl|wget|python-|httpx|aiohttp|okhttp|go-http-client|java/|libwww|axios|node-fetch"
+    r"|^unknown$|^$"
+)), re.IGNORECASE)
+
+
+def parse_sample_rates(value: str) -> dict:
+    """"search=0.1,jobs=0.25" -> {"search": 0.1, "jobs": 0.25}"""
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            endpoint, rate = item.split("=", 1)
+            rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+# endpoint -> share of visits stored; unlisted endpoints keep every visit
+VISIT_SAMPLE_RATES = parse_sample_rates(os.getenv("VISIT_SAMPLE_RATES", ""))
+
+
+@functools.lru_cache(maxsize=4096)
+def is_bot(user_agent: str) -> bool:
+    return BOT_PATTERN.search(user_agent or "") is not None
+
+
+def sample_weight(endpoint: str) -> int:
+    """Weight to store a human visit to `endpoint` with, or 0 when sampling leaves it out"""
+    rate = VISIT_SAMPLE_RATES.get(endpoint, 1.0)
+    if rate >= 1.0:
+        return 1
+    if rate <= 0.0 or random.random() >= rate:
+        return 0
+    # floor(1/rate), plus one with probability of the remainder: 1/rate on average
+    whole, fraction = divmod(1 / rate, 1)
+    return int(whole) + (random.random() < fraction)
+
+
+class VisitWriter:
+    """Bounded in-process queue that flushes visits on a size or time threshold"""
+
+    def __init__(self, batch_size=VISIT_BATCH_SIZE, flush_interval=VISIT_FLUSH_INTERVAL,
+                 max_queue=VISIT_QUEUE_SIZE, session_factory=WriterSessionLocal,
+                 cache_size=USER_AGENT_CACHE_SIZE):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.skipped = 0  # bots and visits left out by sampling
+        self.written = 0
+        self.failed = 0
+        self.user_agent_ids = {}  # user agent -> user_agents.id, only touched by the writer
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enqueue(self, ip_address: str, user_agent: str, job_id: int = None,
+                weight: int = 1) -> bool:
+        """Queue a visit without blocking; returns False when the queue is full
+
+        A weight of None queues the visit for the unique-visitor sketch only.
+        """
+        row = {
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "job_id": job_id,
+            "visited_at": datetime.datetime.utcnow(),
+            "weight": weight,
+        }
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def track(self, ip_address: str, user_agent: str, endpoint: str, job_id: int = None) -> bool:
+        """Filter and sample a visit to `endpoint`, queueing it if it is kept"""
+        if is_bot(user_agent):
+            if VISIT_BOTS != "tag":
+                self.skipped += 1
+                return False
+            return self.enqueue(ip_address, user_agent, job_id, 0)
+        weight = sample_weight(endpoint)
+        if not weight:
+            self.skipped += 1
+            return self.enqueue(ip_address, user_agent, job_id, None)
+        return self.enqueue(ip_address, user_agent, job_id, weight)
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self):
+        """Start the background flush thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="visit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flush thread and write out anything still queued"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        while self.flush():
+            pass
+
+    def flush(self) -> int:
+        """Bulk-insert up to one batch of queued visits; returns rows taken"""
+        rows = self._drain(self.batch_size)
+        if rows:
+            self._write(rows)
+        return len(rows)
+
+    def _drain(self, limit: int) -> list:
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _user_agent_ids(self, db, values: set) -> dict:
+        """user_agents ids for a batch's user agents, inserting the new ones"""
+        missing = values - self.user_agent_ids.keys()
+        if missing and len(self.user_agent_ids) + len(missing) > self.cache_size:
+            # Start over with this batch's agents only, looking up the ones cached before too
+            self.user_agent_ids.clear()
+            missing = set(values)
+        if missing:
+            found = dict(db.execute(
+                select(models.UserAgent.value, models.UserAgent.id)
+                .where(models.UserAgent.value.in_(missing))
+            ).all())
+            for value in missing - found.keys():
+                try:
+                    with db.begin_nested():
+                        user_agent = models.UserAgent(value=value, is_bot=is_bot(value))
+                        db.add(user_agent)
+                    found[value] = user_agent.id
+                except IntegrityError:
+                    # Another worker inserted it first
+                    found[value] = db.execute(
+                        select(models.UserAgent.id).where(models.UserAgent.value == value)
+                    ).scalar_one()
+            self.user_agent_ids.update(found)
+        return {value: self.user_agent_ids[value] for value in values}
+
+    def _write(self, rows: list):
+        stored = [row for row in rows if row["weight"] is not None]
+        db = self.session_factory()
+        try:
+            if stored:
+                ids = self._user_agent_ids(db, {row["user_agent"] for row in stored})
+                db.execute(insert(models.UserVisit), [
+                    {
+                        "ip_address": row["ip_address"],
+                        "user_agent_id": ids[row["user_agent"]],
+                        "job_id": row["job_id"],
+                        "visited_at": row["visited_at"],
+                        "weight": row["weight"],
+                    }
+                    for row in stored
+                ])
+            stats.record_visits(db, rows)
+            db.commit()
+            self.written += len(stored)
+        except Exception:
+            db.rollback()
+            # Ids inserted by the rolled-back transaction are gone
+            self.user_agent_ids.clear()
+            self.failed += len(stored)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Give the batch a chance to fill before writing it out
+            deadline = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.flush_interval)
+            rows = [first]
+            while len(rows) < self.batch_size and not self._stop.is_set():
+                remaining = (deadline - datetime.datetime.utcnow()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(rows)
+
+
+visit_writer = VisitWriter()
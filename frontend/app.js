@@ -23,7 +23,7 @@ async function cachedFetch(url, options = {}) {
     if (apiCache.has(cacheKey)) {
         const { data, timestamp } = apiCache.get(cacheKey);
         if (Date.now() - timestamp < CACHE_TIME) {
-            return data;
+            return { data, ok: true, status: 200 };
         }
         apiCache.delete(cacheKey);
     }
@@ -117,8 +117,12 @@ document.getElementById("adminLoginForm").addEventListener("submit", async (e) =
 
 // ============= ADMIN LOGOUT =============
 document.getElementById("logoutBtn").addEventListener("click", () => {
+    if (currentAdminToken) {
+        fetch(`${API_BASE}/admin/logout?token=${currentAdminToken}`, { method: "POST" }).catch(() => {});
+    }
     localStorage.removeItem("adminToken");
     currentAdminToken = null;
+    stopStats();
     adminDashboard.style.display = "none";
     adminLoginBtn.textContent = "Admin Login";
     showAlert("Logged out successfully", "success");
@@ -138,10 +142,14 @@ document.querySelectorAll(".tab-btn").forEach(btn => {
         const tabId = btn.getAttribute("data-tab");
         document.getElementById(tabId).classList.add("active");
         
+        if (tabId === "stats") {
+            loadStats();
+        } else {
+            stopStats();
+        }
+        
         if (tabId === "manage-jobs") {
             loadAdminJobs();
-        } else if (tabId === "stats") {
-            loadStats();
         }
     });
 });
@@ -202,7 +210,7 @@ async function loadAdminJobs() {
     
     try {
         showLoading(true);
-        const response = await cachedFetch(`${API_BASE}/jobs?token=${currentAdminToken}`);
+        const response = await cachedFetch(`${API_BASE}/jobs?fields=summary&token=${currentAdminToken}`);
         const jobs = response.data;
         
         const adminJobsList = document.getElementById("adminJobsList");
@@ -353,15 +361,29 @@ async function deleteJob(jobId) {
 }
 
 // ============= LOAD STATISTICS =============
+// Live while the stats tab is open: the server pushes a snapshot, then only changed values
+let statsSource = null;
+
+function showStats(stats) {
+    if ("total_visits" in stats) document.getElementById("totalVisits").textContent = stats.total_visits;
+    if ("unique_visitors" in stats) document.getElementById("uniqueVisitors").textContent = stats.unique_visitors;
+    if ("total_jobs" in stats) document.getElementById("totalJobs").textContent = stats.total_jobs;
+}
+
 async function loadStats() {
+    if (window.EventSource) {
+        if (statsSource) return;
+        statsSource = new EventSource(`${API_BASE}/stats/stream`);
+        const onEvent = (e) => showStats(JSON.parse(e.data));
+        statsSource.addEventListener("snapshot", onEvent);
+        statsSource.addEventListener("delta", onEvent);
+        return;
+    }
+    
     try {
         showLoading(true);
         const response = await cachedFetch(`${API_BASE}/stats`);
-        const stats = response.data;
-        
-        document.getElementById("totalVisits").textContent = stats.total_visits;
-        document.getElementById("uniqueVisitors").textContent = stats.unique_visitors;
-        document.getElementById("totalJobs").textContent = stats.total_jobs;
+        showStats(response.data);
         showLoading(false);
     } catch (error) {
         console.error("Error loading stats:", error);
@@ -369,6 +391,13 @@ async function loadStats() {
     }
 }
 
+function stopStats() {
+    if (statsSource) {
+        statsSource.close();
+        statsSource = null;
+    }
+}
+
 // ============= LOAD ADMIN DASHBOARD =============
 function loadAdminDashboard() {
     if (currentAdminToken) {
@@ -377,11 +406,18 @@ function loadAdminDashboard() {
 }
 
 // ============= LOAD ALL JOBS =============
+const JOBS_PER_PAGE = 10;
+let listUrl = `${API_BASE}/jobs?fields=summary&limit=${JOBS_PER_PAGE}`;
+let nextCursor = null;
+
 async function loadJobs() {
     try {
         showLoading(true);
-        const response = await cachedFetch(`${API_BASE}/jobs`);
-        allJobs = response.data || [];
+        listUrl = `${API_BASE}/jobs?fields=summary&limit=${JOBS_PER_PAGE}`;
+        const response = await cachedFetch(listUrl);
+        const page = response.data || {};
+        allJobs = page.items || [];
+        nextCursor = page.next_cursor || null;
         displayJobs(allJobs);
         showLoading(false);
     } catch (error) {
@@ -390,10 +426,7 @@ async function loadJobs() {
     }
 }
 
-// ============= DISPLAY JOBS (WITH PAGINATION) =============
-const JOBS_PER_PAGE = 10;
-let currentPage = 1;
-
+// ============= DISPLAY JOBS (WITH CURSOR PAGINATION) =============
 function displayJobs(jobs) {
     const jobsList = document.getElementById("jobsList");
     
@@ -402,10 +435,7 @@ function displayJobs(jobs) {
         return;
     }
     
-    currentPage = 1;
-    const paginatedJobs = jobs.slice(0, JOBS_PER_PAGE);
-    
-    jobsList.innerHTML = paginatedJobs.map(job => `
+    jobsList.innerHTML = jobs.map(job => `
         <div class="job-card" onclick="viewJobDetails(${job.id})">
             <h3>${job.job_name}</h3>
             <p class="job-company"><i class="fas fa-building"></i> ${job.company}</p>
@@ -419,7 +449,7 @@ function displayJobs(jobs) {
                     <span>${job.eligible_years}</span>
                 </div>
             </div>
-            <p class="job-description">${job.job_description}</p>
+            <p class="job-description">${job.summary}</p>
             <div class="job-footer">
                 <span class="last-date"><i class="fas fa-calendar"></i> ${job.last_date}</span>
                 <button class="btn btn-primary" onclick="event.stopPropagation(); openJobLink('${job.link}')">
@@ -429,64 +459,47 @@ function displayJobs(jobs) {
         </div>
     `).join("");
     
-    if (jobs.length > JOBS_PER_PAGE) {
+    if (nextCursor) {
         jobsList.innerHTML += `
             <div style="text-align: center; padding: 20px;">
-                <button class="btn btn-secondary" onclick="loadMoreJobs(${jobs.length})">
-                    Load More Jobs (${jobs.length - paginatedJobs.length} remaining)
+                <button class="btn btn-secondary" onclick="loadMoreJobs()">
+                    Load More Jobs
                 </button>
             </div>
         `;
     }
 }
 
-// Load more jobs
-function loadMoreJobs(totalJobs) {
-    currentPage++;
-    const end = currentPage * JOBS_PER_PAGE;
-    const morePaginatedJobs = allJobs.slice(0, end);
-    
-    const jobsList = document.getElementById("jobsList");
-    
-    jobsList.innerHTML = morePaginatedJobs.map(job => `
-        <div class="job-card" onclick="viewJobDetails(${job.id})">
-            <h3>${job.job_name}</h3>
-            <p class="job-company"><i class="fas fa-building"></i> ${job.company}</p>
-            <div class="job-meta">
-                <div class="job-meta-item">
-                    <i class="fas fa-map-marker-alt"></i>
-                    <span>${job.location}</span>
-                </div>
-                <div class="job-meta-item">
-                    <i class="fas fa-clock"></i>
-                    <span>${job.eligible_years}</span>
-                </div>
-            </div>
-            <p class="job-description">${job.job_description}</p>
-            <div class="job-footer">
-                <span class="last-date"><i class="fas fa-calendar"></i> ${job.last_date}</span>
-                <button class="btn btn-primary" onclick="event.stopPropagation(); openJobLink('${job.link}')">
-                    Apply Now
-                </button>
-            </div>
-        </div>
-    `).join("");
+// Load the next page of the current listing
+async function loadMoreJobs() {
+    if (!nextCursor) return;
     
-    if (allJobs.length > end) {
-        jobsList.innerHTML += `
-            <div style="text-align: center; padding: 20px;">
-                <button class="btn btn-secondary" onclick="loadMoreJobs(${totalJobs})">
-                    Load More Jobs (${allJobs.length - end} remaining)
-                </button>
-            </div>
-        `;
+    try {
+        showLoading(true);
+        const response = await cachedFetch(`${listUrl}&cursor=${encodeURIComponent(nextCursor)}`);
+        const page = response.data || {};
+        allJobs = allJobs.concat(page.items || []);
+        nextCursor = page.next_cursor || null;
+        displayJobs(allJobs);
+        showLoading(false);
+    } catch (error) {
+        console.error("Error loading more jobs:", error);
+        showLoading(false);
     }
 }
 
 // ============= VIEW JOB DETAILS =============
-function viewJobDetails(jobId) {
-    const job = allJobs.find(j => j.id === jobId);
-    if (!job) return;
+async function viewJobDetails(jobId) {
+    // Listings only carry summary fields; the detail call returns the full job
+    let job;
+    try {
+        const response = await cachedFetch(`${API_BASE}/jobs/${jobId}`);
+        if (!response.ok) return;
+        job = response.data;
+    } catch (error) {
+        console.error("Error loading job:", error);
+        return;
+    }
     
     const jobDetails = document.getElementById("jobDetails");
     jobDetails.innerHTML = `
@@ -547,15 +560,15 @@ async function loadFilters() {
         
         const yearsFilter = document.getElementById("yearsFilter");
         yearsFilter.innerHTML = '<option value="">All Years</option>' + 
-            allYears.map(year => `<option value="${year}">${year}</option>`).join("");
+            allYears.map(year => `<option value="${year.value}">${year.value} (${year.count})</option>`).join("");
         
         const locationFilter = document.getElementById("locationFilter");
         locationFilter.innerHTML = '<option value="">All Locations</option>' + 
-            allLocations.map(loc => `<option value="${loc}">${loc}</option>`).join("");
+            allLocations.map(loc => `<option value="${loc.value}">${loc.value} (${loc.count})</option>`).join("");
         
         const yearsTabsContainer = document.getElementById("yearsTabsContainer");
         yearsTabsContainer.innerHTML = allYears.map(year => 
-            `<button class="job-tab-btn" data-tab="years-${year.replace(/\s+/g, '-')}">${year}</button>`
+            `<button class="job-tab-btn" data-tab="years-${year.value.replace(/\s+/g, '-')}" data-year="${year.value}">${year.value}</button>`
         ).join("");
         
         document.querySelectorAll(".job-tab-btn").forEach(btn => {
@@ -564,13 +577,8 @@ async function loadFilters() {
                 btn.classList.add("active");
                 
                 const tabName = btn.getAttribute("data-tab");
-                if (tabName === "all-jobs") {
-                    displayJobs(allJobs);
-                } else {
-                    const year = btn.textContent;
-                    const filtered = allJobs.filter(job => job.eligible_years.includes(year));
-                    displayJobs(filtered);
-                }
+                document.getElementById("yearsFilter").value = tabName === "all-jobs" ? "" : btn.dataset.year;
+                performSearch();
             });
         });
     } catch (error) {
@@ -584,7 +592,29 @@ document.getElementById("searchInput").addEventListener("keypress", (e) => {
     if (e.key === "Enter") performSearch();
 });
 
-document.getElementById("searchInput").addEventListener("input", debounce(performSearch, 500));
+// Typing only asks for suggestions; the full search runs on Enter or the button
+document.getElementById("searchInput").addEventListener("input", debounce(loadSuggestions, 150));
+
+async function loadSuggestions() {
+    const prefix = document.getElementById("searchInput").value.trim();
+    const list = document.getElementById("searchSuggestions");
+    if (!prefix) {
+        list.innerHTML = "";
+        return;
+    }
+    
+    try {
+        const response = await cachedFetch(`${API_BASE}/suggest?prefix=${encodeURIComponent(prefix)}`);
+        list.replaceChildren(...(response.data || []).map(s => {
+            const option = document.createElement("option");
+            option.value = s.value;
+            option.label = s.type;
+            return option;
+        }));
+    } catch (error) {
+        console.error("Error loading suggestions:", error);
+    }
+}
 
 async function performSearch() {
     const query = document.getElementById("searchInput").value;
@@ -593,17 +623,22 @@ async function performSearch() {
     
     try {
         showLoading(true);
-        let url = `${API_BASE}/search?`;
-        if (query) url += `q=${encodeURIComponent(query)}&`;
-        if (years) url += `years=${encodeURIComponent(years)}&`;
-        if (location) url += `location=${encodeURIComponent(location)}&`;
-        
-        const response = await cachedFetch(url);
-        const results = response.data || [];
-        displayJobs(results);
+        let url = `${API_BASE}/search?fields=summary&limit=${JOBS_PER_PAGE}`;
+        if (query) url += `&q=${encodeURIComponent(query)}`;
+        if (years) url += `&years=${encodeURIComponent(years)}`;
+        if (location) url += `&location=${encodeURIComponent(location)}`;
         
-        document.querySelectorAll(".job-tab-btn").forEach(b => b.classList.remove("active"));
-        document.querySelector('[data-tab="all-jobs"]').classList.add("active");
+        let response = await cachedFetch(url);
+        if (query && !(response.data && response.data.items && response.data.items.length)) {
+            // Nothing matched exactly; retry tolerating typos ("Infosis", "Acenture")
+            url += "&fuzzy=true";
+            response = await cachedFetch(url);
+        }
+        listUrl = url;
+        const page = response.data || {};
+        allJobs = page.items || [];
+        nextCursor = page.next_cursor || null;
+        displayJobs(allJobs);
         showLoading(false);
     } catch (error) {
         console.error("Error searching:", error);
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Frontend build step
+
+Copies app.js and styles.css to content-hashed names (app.<hash>.js), points
+index.html at them, and writes a gzip-9 copy of every file next to it:
+
+    frontend/dist/
+        index.html  index.html.gz
+        app.3f9c1b2a7d.js  app.3f9c1b2a7d.js.gz
+        styles.81ad04e6c2.css  styles.81ad04e6c2.css.gz
+        manifest.json
+
+The backend serves dist/ with the precompressed bytes, so nothing is
+compressed per request and hashed files can be cached forever.
+
+    python build.py [--out DIR]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT_DIR = os.path.join(SOURCE_DIR, "dist")
+
+ENTRY = "index.html"
+ASSETS = ["app.js", "styles.css"]
+HASH_LENGTH = 10
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+def write(out_dir: str, name: str, data: bytes):
+    """Write a file and its gzip twin (mtime 0 keeps builds reproducible)"""
+    with open(os.path.join(out_dir, name), "wb") as f:
+        f.write(data)
+    with open(os.path.join(out_dir, name + ".gz"), "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def build(out_dir: str = DEFAULT_OUT_DIR) -> dict:
+    """Build dist/ and return the manifest of source name -> hashed name"""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+
+    manifest = {}
+    for name in ASSETS:
+        with open(os.path.join(SOURCE_DIR, name), "rb") as f:
+            data = f.read()
+        manifest[name] = hashed_name(name, data)
+        write(out_dir, manifest[name], data)
+
+    with open(os.path.join(SOURCE_DIR, ENTRY), encoding="utf-8") as f:
+        html = f.read()
+    for name, target in manifest.items():
+        html = re.sub(rf'(\b(?:href|src)=["\']){re.escape(name)}(["\'])', rf"\g<1>{target}\g<2>", html)
+    write(out_dir, ENTRY, html.encode("utf-8"))
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and pre-gzip the frontend assets")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory (default: frontend/dist)")
+    args = parser.parse_args()
+
+    for name, target in build(args.out).items():
+        print(f"{name} -> {target}")
+
+
+if __name__ == "__main__":
+    main()